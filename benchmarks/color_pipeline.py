@@ -0,0 +1,88 @@
+"""Accuracy and speed of the colour lookup tables against the per channel arithmetic they replace.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/color_pipeline.py
+"""
+import colorsys
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.lednetwf_ble.colors import (
+    rgb_to_hsv,
+    rgb_to_hsv_array,
+    scale_array,
+    scale_rgb,
+    unscale_rgb,
+)
+
+
+def reference_scale(rgb, percent):
+    return tuple(max(0, min(255, int(component * percent / 100))) for component in rgb)
+
+
+def reference_unscale(rgb, percent):
+    return tuple(max(0, min(255, int(component * 100 / max(percent, 1)))) for component in rgb)
+
+
+def reference_hsv(r, g, b):
+    h, s, v = colorsys.rgb_to_hsv(r / 255.0, g / 255.0, b / 255.0)
+    return (int(h * 360), int(s * 100), int(v * 100))
+
+
+def check_accuracy() -> None:
+    for percent in range(101):
+        for component in range(256):
+            rgb = (component, 255 - component, component // 2)
+            assert scale_rgb(rgb, percent) == reference_scale(rgb, percent)
+            assert unscale_rgb(rgb, percent) == reference_unscale(rgb, percent)
+
+    # Round trip through the device: scale for sending, unscale the reported value.  Both directions truncate, so the
+    # error is bounded by two brightness steps of 100 / percent each.
+    worst = 0
+    for percent in range(1, 101):
+        for component in range(256):
+            back = unscale_rgb(scale_rgb((component,) * 3, percent), percent)[0]
+            worst = max(worst, (component - back) * percent / 100)
+    assert worst < 2, worst
+    print(f"brightness tables match the arithmetic for all 101 x 256 inputs, round trip error {worst:.2f} steps")
+
+    rng = np.random.default_rng(0)
+    sample = rng.integers(0, 256, size=(200_000, 3))
+    batch  = rgb_to_hsv_array(sample)
+    for rgb, hsv in zip(sample.tolist(), batch.tolist()):
+        expected = reference_hsv(*rgb)
+        assert tuple(rgb_to_hsv(*rgb)) == expected, (rgb, expected)
+        assert tuple(hsv) == expected, (rgb, hsv, expected)
+    print("rgb_to_hsv and rgb_to_hsv_array match colorsys for 200k random colours")
+
+
+def check_speed() -> None:
+    rgb = (200, 100, 50)
+    rows = [
+        ("scale, generator expression", lambda: reference_scale(rgb, 57)),
+        ("scale, lookup table",         lambda: scale_rgb(rgb, 57)),
+        ("unscale, generator",          lambda: reference_unscale(rgb, 57)),
+        ("unscale, lookup table",       lambda: unscale_rgb(rgb, 57)),
+        ("rgb_to_hsv, colorsys",        lambda: reference_hsv(*rgb)),
+        ("rgb_to_hsv, cached",          lambda: rgb_to_hsv(*rgb)),
+    ]
+    for name, func in rows:
+        per_call = min(timeit.repeat(func, number=100_000, repeat=3)) / 100_000
+        print(f"{name:<30} {per_call * 1e9:8.0f} ns")
+
+    frame = np.random.default_rng(1).integers(0, 256, size=(900, 3), dtype=np.uint8)
+    per_frame = min(timeit.repeat(lambda: scale_array(frame, 57), number=10_000, repeat=3)) / 10_000
+    print(f"{'scale_array, 900 LEDs':<30} {per_frame * 1e6:8.1f} us")
+    per_frame = min(timeit.repeat(lambda: rgb_to_hsv_array(frame), number=1_000, repeat=3)) / 1_000
+    print(f"{'rgb_to_hsv_array, 900 LEDs':<30} {per_frame * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    check_accuracy()
+    check_speed()
@@ -0,0 +1,80 @@
+"""How accurately flash() lands its on/off frames, compared with an automation toggling the light itself.
+
+The simulated device gets a write latency with some jitter.  Each power frame's arrival is timed at the device and
+compared with where it should have landed on a fixed half period rhythm.  The automation style loop goes
+through turn_on/turn_off and sleeps half a period between calls, so every write's latency adds to the drift.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/flash_timing.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.components.light import FLASH_LONG
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble.const import STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.lednetwf import FLASH_CYCLES, FLASH_PERIOD
+from custom_components.lednetwf_ble.simulator import SimulatedDevice, async_create_instance
+
+LATENCY      = (0.010, 0.020) # Seconds per write, drawn afresh for every write
+TARGET_ERROR = LATENCY[1] - LATENCY[0] + 0.002 # Jitter can't be predicted, so the target is the jitter plus scheduling slack
+
+
+def timing(arrivals: list[float]) -> tuple[float, float]:
+    # Where the flash starts doesn't matter, its rhythm does.  Errors are measured against the median phase.
+    offsets = [arrival - n * FLASH_PERIOD / 2 for n, arrival in enumerate(arrivals)]
+    phase   = sorted(offsets)[len(offsets) // 2]
+    errors  = [abs(offset - phase) for offset in offsets]
+    return sum(errors) / len(errors), max(errors)
+
+
+async def main() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    rng  = random.Random(0)
+    device = SimulatedDevice(model=STRIP_LIGHT_MODEL)
+    instance, client = await async_create_instance(hass, device, options={"delay": 120})
+    await instance._packing_probe
+
+    arrivals    = []
+    handle      = device.handle_frame
+    def timed(frame):
+        if len(frame) > 9 and frame[8] == 0x3b and frame[9] in (0x23, 0x24):
+            arrivals.append(time.monotonic())
+        return handle(frame)
+    device.handle_frame = timed
+    write = client.write_gatt_char
+    async def jittery(char, data, response=False):
+        client.latency = rng.uniform(*LATENCY)
+        await write(char, data, response)
+    client.write_gatt_char = jittery
+
+    frames = 2 * FLASH_CYCLES[FLASH_LONG]
+    for n in range(frames):
+        await (instance.turn_off() if n % 2 == 0 else instance.turn_on())
+        if n < frames - 1:
+            await asyncio.sleep(FLASH_PERIOD / 2)
+    naive = timing(arrivals)
+
+    arrivals.clear()
+    result = await instance.flash(FLASH_LONG)
+    flash  = timing(arrivals)
+    assert len(arrivals) == frames and device.is_on, "Flash didn't send every frame or didn't leave the light on"
+
+    print(f"{frames} frames, {FLASH_PERIOD:.1f}s period, write latency {LATENCY[0] * 1000:.0f}-{LATENCY[1] * 1000:.0f}ms")
+    print(f"  turn_on/turn_off loop: {naive[0] * 1000:6.2f}ms mean, {naive[1] * 1000:6.2f}ms max error")
+    print(f"  flash():               {flash[0] * 1000:6.2f}ms mean, {flash[1] * 1000:6.2f}ms max error (reported {result['max_error'] * 1000:.2f}ms)")
+    assert flash[1] <= TARGET_ERROR, f"Flash timing error {flash[1] * 1000:.2f}ms is over the {TARGET_ERROR * 1000:.0f}ms target"
+    await instance.stop()
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
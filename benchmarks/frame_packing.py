@@ -0,0 +1,62 @@
+"""End to end latency of multi-packet state changes to a simulated controller.
+
+Compares one write per frame sent one after another (the old behaviour), pipelined writes, and several frames packed
+into each write.  The simulator models each write as one connection interval of latency, so these numbers are a best
+case; on real radios the gain from pipelining depends on how many writes the adapter queues per connection event.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/frame_packing.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble.const import STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.simulator import SimulatedDevice, async_create_instance
+
+CHANGES   = 100
+LATENCIES = (0.0, 0.0075)
+
+
+def packets_for(instance, n: int) -> list[bytearray]:
+    # Power, colour and brightness together, about the worst case for a scene change
+    return [instance._power_packet(True), instance._rgb_packet((n % 256, 255 - n % 256, 64), 50 + n % 50)]
+
+
+async def run(hass, latency: float, mode: str) -> tuple[float, float]:
+    device = SimulatedDevice(model=STRIP_LIGHT_MODEL, accepts_packed=True)
+    instance, client = await async_create_instance(hass, device, latency=latency)
+    await instance._packing_probe
+    instance._packing_supported = mode == "packed"
+    writes = client.writes
+    start  = time.perf_counter()
+    for n in range(CHANGES):
+        packets = packets_for(instance, n)
+        if mode == "sequential":
+            for packet in packets:
+                await instance._write(packet)
+        else:
+            await instance.write_packets(packets)
+    elapsed = time.perf_counter() - start
+    return elapsed / CHANGES * 1000, (client.writes - writes) / CHANGES
+
+
+async def main() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    print(f"{'latency':>8} {'mode':>11} {'ms/change':>10} {'writes/change':>14}")
+    for latency in LATENCIES:
+        for mode in ("sequential", "pipelined", "packed"):
+            per_change, writes = await run(hass, latency, mode)
+            print(f"{latency * 1000:>6.1f}ms {mode:>11} {per_change:>10.2f} {writes:>14.1f}")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""Memory held per device, measured with tracemalloc over 10, 100 and 1000 simulated instances.
+
+Instances are built the way the simulator does it, from advertisement data and without a connection, and have decoded
+one status notification, which is what an idle light in a large installation looks like.  Each instance also has a
+light entity attached, since that is what Home Assistant keeps alongside it.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/instance_memory.py
+"""
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble.const import RING_LIGHT_MODEL, STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.lednetwf import LEDNETWFInstance
+from custom_components.lednetwf_ble.light import LEDNETWFLight
+from custom_components.lednetwf_ble.simulator import SimulatedBLEDevice, SimulatedDevice
+
+COUNTS = (10, 100, 1000)
+
+
+def build(hass, count: int) -> list:
+    devices = []
+    for n in range(count):
+        mac      = f"AA:BB:CC:{n >> 16 & 0xFF:02X}:{n >> 8 & 0xFF:02X}:{n & 0xFF:02X}"
+        device   = SimulatedDevice(model=RING_LIGHT_MODEL if n % 2 else STRIP_LIGHT_MODEL)
+        instance = LEDNETWFInstance(mac, hass, {}, {}, ble_device=SimulatedBLEDevice(mac), manufacturer_data=device.manufacturer_data())
+        instance._notification_handler(None, bytearray(device.status_notification()))
+        devices.append((instance, LEDNETWFLight(instance, f"Light {n}", mac)))
+    return devices
+
+
+async def measure(hass, count: int) -> float:
+    build(hass, 1) # Warm up module level caches so they aren't counted against the first run
+    gc.collect()
+    tracemalloc.start()
+    before  = tracemalloc.take_snapshot()
+    devices = build(hass, count)
+    gc.collect()
+    after   = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    for instance, _light in devices:
+        await instance.stop()
+    return size / count
+
+
+async def main() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    for count in COUNTS:
+        print(f"{count:5} devices: {await measure(hass, count):8.0f} bytes/device")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
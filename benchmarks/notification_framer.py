@@ -0,0 +1,87 @@
+"""Decode cost of the notification framer, for whole, fragmented and hostile input.
+
+The reference is the parser the notification handler used before the framer: the payload between the last two quotes
+of each notification, which can't reassemble fragments and reads the whole of any notification it's given.
+
+Run from the repository root:
+
+    python benchmarks/notification_framer.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.lednetwf_ble.framer import NotificationFramer
+from custom_components.lednetwf_ble.simulator import SimulatedDevice
+
+FRAGMENT = 20 # Bytes per notification at the default ATT MTU
+ROUNDS   = 2000
+
+
+def reference_payload(data):
+    response_str = data.decode("utf-8", errors="ignore")
+    last_quote = response_str.rfind('"')
+    if last_quote > 0:
+        first_quote = response_str.rfind('"', 0, last_quote)
+        if first_quote > 0:
+            try:
+                return bytearray.fromhex(response_str[first_quote+1:last_quote])
+            except ValueError:
+                return None
+    return None
+
+
+def fragments(data: bytes, size: int) -> list[bytes]:
+    return [data[n:n + size] for n in range(0, len(data), size)]
+
+
+def check_reassembly(device: SimulatedDevice) -> None:
+    expected = [bytearray(device.status_notification()), bytearray(device.settings_notification())]
+    stream   = b"".join(bytes(document) for document in expected) * 50
+    framer   = NotificationFramer()
+    payloads = [payload for chunk in fragments(stream, FRAGMENT) for payload in framer.feed(chunk)]
+    assert len(payloads) == 100, f"Expected 100 payloads from fragments, got {len(payloads)}"
+    assert [reference_payload(document) for document in expected] * 50 == payloads, "Reassembled payloads differ"
+    fragmented = [reference_payload(chunk) for chunk in fragments(stream, FRAGMENT)]
+    print(f"Reassembly: framer recovered {len(payloads)}/100 payloads, the reference parser {sum(p is not None for p in fragmented)}/100")
+
+
+def run(name: str, notifications: list[bytes]) -> None:
+    framer = NotificationFramer()
+
+    def framed():
+        for data in notifications:
+            framer.feed(data)
+
+    def reference():
+        for data in notifications:
+            reference_payload(data)
+
+    total = sum(len(data) for data in notifications)
+    for label, function in (("framer", framed), ("reference", reference)):
+        seconds = min(timeit.repeat(function, number=ROUNDS // 10, repeat=3)) / (ROUNDS // 10)
+        print(f"  {name:<28} {label:<10} {seconds * 1e6:9.1f} us per input, {seconds / total * 1e9:7.1f} ns/byte")
+
+
+def main() -> None:
+    device = SimulatedDevice()
+    check_reassembly(device)
+    status = bytes(device.status_notification())
+    cases = {
+        "whole status":               [status],
+        "fragmented status":          fragments(status, FRAGMENT),
+        "64KB without braces":        [b"A" * 65536],
+        "64KB after an open brace":   [b"{" + b"A" * 65535],
+        "64KB of quoted hex":         [b'{"payload":"' + b"00" * 32760 + b'"}'],
+        "64KB of braces":             [b"{}" * 32768],
+        "64KB of document starts":    [b'{"}' * 21845],
+    }
+    print(f"Decode cost, best of 3 over {ROUNDS // 10} rounds:")
+    for name, notifications in cases.items():
+        run(name, notifications)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Frames per second for per pixel streaming to a simulated 0x56 strip.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/pixel_stream.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble.const import STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.simulator import SimulatedDevice, async_create_instance
+
+LED_COUNTS = (100, 300, 900)
+FRAMES     = 200
+LATENCIES  = (0.0, 0.0075) # No radio at all, and one 7.5ms connection interval per write
+
+
+async def run(hass, led_count: int, latency: float, sparse: bool) -> tuple[float, float]:
+    device = SimulatedDevice(model=STRIP_LIGHT_MODEL, led_count=led_count)
+    instance, client = await async_create_instance(hass, device, latency=latency)
+    instance._led_count = led_count
+    rng    = np.random.default_rng(0)
+    frame  = rng.integers(0, 256, size=(led_count, 3), dtype=np.uint8)
+    await instance.set_pixels(frame, 255)
+    writes = client.writes
+    start  = time.perf_counter()
+    for n in range(FRAMES):
+        if sparse:
+            frame[n % led_count] = rng.integers(0, 256, size=3) # One pixel changes per frame
+        else:
+            frame = rng.integers(0, 256, size=(led_count, 3), dtype=np.uint8)
+        await instance.set_pixels(frame, 255)
+    elapsed = time.perf_counter() - start
+    return FRAMES / elapsed, (client.writes - writes) / FRAMES
+
+
+async def main() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    print(f"{'LEDs':>5} {'latency':>8} {'changes':>8} {'fps':>10} {'writes/frame':>13}")
+    for latency in LATENCIES:
+        for led_count in LED_COUNTS:
+            for sparse in (False, True):
+                fps, writes = await run(hass, led_count, latency, sparse)
+                print(f"{led_count:>5} {latency * 1000:>6.1f}ms {'1 pixel' if sparse else 'all':>8} {fps:>10.1f} {writes:>13.1f}")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""What a session saves: per packet overhead, and reconnects in a paced batch.
+
+Uses a zero latency simulated device, so the numbers are the integration's own overhead: connection checks, lock and
+disconnect timer handling.  A session makes no measurable difference to that, the two come out within run to run
+noise of each other.  Where it pays is a batch with gaps longer than the disconnect delay, e.g. send_packets with
+pacing or a flash: without one the idle reaper drops the link in every gap and each write has to reconnect, which on a
+real adapter takes far longer than the write itself.  The second table counts those reconnects.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/session.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble import lednetwf
+from custom_components.lednetwf_ble.const import STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.simulator import SimulatedClient, SimulatedDevice, async_create_instance
+
+PACKETS      = 5000
+RUNS         = 5
+PACED_WRITES = 10
+PACED_DELAY  = 0.05 # Disconnect delay, in seconds, for the paced batch
+PACED_GAP    = 0.1  # Gap between its writes, longer than the delay
+
+
+async def run(hass, pinned: bool) -> float:
+    instance, client = await async_create_instance(hass, SimulatedDevice(model=STRIP_LIGHT_MODEL), options={"delay": 120})
+    await instance._packing_probe
+    packet = instance._rgb_packet((255, 0, 0), 100)
+    start  = time.perf_counter()
+    if pinned:
+        async with instance.session():
+            for n in range(PACKETS):
+                await instance._write(packet)
+    else:
+        for n in range(PACKETS):
+            await instance._write(packet)
+    elapsed = time.perf_counter() - start
+    await instance.stop()
+    return elapsed / PACKETS * 1e6
+
+
+async def run_paced(hass, pinned: bool) -> int:
+    device = SimulatedDevice(model=STRIP_LIGHT_MODEL)
+    instance, client = await async_create_instance(hass, device, options={"delay": PACED_DELAY})
+
+    async def _connect_simulated(*_args, **_kwargs):
+        return SimulatedClient(device)
+
+    # Reconnects go through bleak_retry_connector, point it at the simulated device instead of a radio
+    lednetwf.establish_connection = _connect_simulated
+    connects = instance.metrics["connects"]
+    packet   = instance._rgb_packet((255, 0, 0), 100)
+    if pinned:
+        async with instance.session():
+            for n in range(PACED_WRITES):
+                await asyncio.sleep(PACED_GAP)
+                await instance._write(packet)
+    else:
+        for n in range(PACED_WRITES):
+            await asyncio.sleep(PACED_GAP)
+            await instance._write(packet)
+    reconnects = instance.metrics["connects"] - connects
+    await instance.stop()
+    return reconnects
+
+
+async def main() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    print(f"Per packet overhead, median of {RUNS} runs of {PACKETS} writes")
+    for pinned in (False, True):
+        overhead = statistics.median([await run(hass, pinned) for _ in range(RUNS)])
+        print(f"{'session' if pinned else 'no session':>10}: {overhead:6.1f} us/packet")
+    print(f"Reconnects in {PACED_WRITES} writes {PACED_GAP}s apart, disconnect delay {PACED_DELAY}s")
+    for pinned in (False, True):
+        print(f"{'session' if pinned else 'no session':>10}: {await run_paced(hass, pinned):3d}")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
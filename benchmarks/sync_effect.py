@@ -0,0 +1,67 @@
+"""How closely a synchronised effect start lines up across many simulated strips.
+
+Each simulated device gets a different write latency.  The spread is measured at the devices, as the gap between the
+first and last effect packet arriving, for a plain concurrent set_effect and for async_start_effect_synchronised.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/sync_effect.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble.const import STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.scene import async_start_effect_synchronised
+from custom_components.lednetwf_ble.simulator import SimulatedDevice, async_create_instance
+
+DEVICES     = 24
+LATENCIES   = (0.005, 0.040) # Seconds per write, spread across the devices
+EFFECT      = "Effect 5"
+TARGET_SKEW = 0.005
+
+
+async def build(hass, rng) -> list:
+    devices = []
+    for n in range(DEVICES):
+        device = SimulatedDevice(model=STRIP_LIGHT_MODEL)
+        instance, _ = await async_create_instance(hass, device, mac=f"00:00:00:00:01:{n:02X}", latency=rng.uniform(*LATENCIES))
+        await instance._packing_probe
+        devices.append((instance, device))
+    return devices
+
+
+def skew(devices) -> float:
+    arrivals = [device.last_frame_at for _, device in devices]
+    return max(arrivals) - min(arrivals)
+
+
+async def main() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    rng  = random.Random(0)
+    devices = await build(hass, rng)
+
+    await asyncio.gather(*(instance.set_effect(EFFECT, 255) for instance, _ in devices))
+    naive = skew(devices)
+
+    result = await async_start_effect_synchronised([instance for instance, _ in devices], EFFECT, 255)
+    synced = skew(devices)
+    assert all(device.effect == 0x05 for _, device in devices), "Effect didn't reach every device"
+
+    print(f"{DEVICES} devices, write latency {LATENCIES[0] * 1000:.0f}-{LATENCIES[1] * 1000:.0f}ms")
+    print(f"  concurrent set_effect: {naive * 1000:6.2f}ms spread")
+    print(f"  synchronised start:    {synced * 1000:6.2f}ms spread (reported {result.spread * 1000:.2f}ms, took {result.duration * 1000:.0f}ms)")
+    assert synced <= TARGET_SKEW, f"Synchronised start spread {synced * 1000:.2f}ms is over the {TARGET_SKEW * 1000:.0f}ms target"
+    for instance, _ in devices:
+        await instance.stop()
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
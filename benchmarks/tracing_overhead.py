@@ -0,0 +1,79 @@
+"""What the tracing spans cost on the write and notification paths, with tracing off and while a capture is running.
+
+The spans stay in the hot paths all the time, so with tracing off they need to cost next to nothing compared with the
+rest of a write.
+
+Run from the repository root in a Home Assistant development environment:
+
+    python benchmarks/tracing_overhead.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.lednetwf_ble.const import STRIP_LIGHT_MODEL
+from custom_components.lednetwf_ble.simulator import SimulatedDevice, async_create_instance
+from custom_components.lednetwf_ble.tracing import get_tracer
+
+SPANS     = 1_000_000
+WRITES    = 20_000
+MAX_SPAN  = 1e-6 # Seconds a span may cost with tracing off
+
+
+def span_cost(tracer) -> float:
+    start = time.perf_counter()
+    for _ in range(SPANS):
+        with tracer.span("gatt_write", "00:00:00:00:00:01"):
+            pass
+    return (time.perf_counter() - start) / SPANS
+
+
+def bare_cost() -> float:
+    context = nullcontext()
+    start   = time.perf_counter()
+    for _ in range(SPANS):
+        with context:
+            pass
+    return (time.perf_counter() - start) / SPANS
+
+
+async def write_cost(instance) -> float:
+    packet = instance._rgb_packet((255, 0, 0), 100)
+    start  = time.perf_counter()
+    for _ in range(WRITES):
+        await instance._write(packet)
+    await asyncio.sleep(0) # Let the last notification be handled
+    return (time.perf_counter() - start) / WRITES
+
+
+async def main() -> None:
+    hass   = HomeAssistant(tempfile.mkdtemp())
+    tracer = get_tracer(hass)
+    instance, _client = await async_create_instance(hass, SimulatedDevice(model=STRIP_LIGHT_MODEL))
+    await instance._packing_probe
+
+    await write_cost(instance) # Warm up
+    bare     = bare_cost()
+    disabled = span_cost(tracer)
+    off      = await write_cost(instance)
+    tracer.enabled = True
+    enabled  = span_cost(tracer)
+    on       = await write_cost(instance)
+    tracer.enabled = False
+    await hass.async_stop(force=True)
+
+    print(f"{'':>26} {'tracing off':>12} {'tracing on':>12}")
+    print(f"{'span (ns)':>26} {disabled * 1e9:>12.0f} {enabled * 1e9:>12.0f}   (empty with block {bare * 1e9:.0f}ns)")
+    print(f"{'write + notification (us)':>26} {off * 1e6:>12.1f} {on * 1e6:>12.1f}")
+    assert disabled < MAX_SPAN, f"A span costs {disabled * 1e9:.0f}ns with tracing off"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
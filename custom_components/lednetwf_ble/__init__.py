@@ -1,42 +1,63 @@
 from __future__ import annotations
 
+from homeassistant.components import bluetooth
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, Event
-from homeassistant.const import CONF_MAC, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_MAC
 from homeassistant.const import Platform
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, CONF_RESET, CONF_DELAY, CONF_LEDCOUNT, CONF_LEDTYPE, CONF_COLORORDER
-from .lednetwf import LEDNETWFInstance
+from .const import DOMAIN, FILES_DIR, CONF_RESET, CONF_DELAY, CONF_LEDCOUNT, CONF_LEDTYPE, CONF_COLORORDER, CONF_RECORD, CONF_PERSISTENT
+from .recorder import TrafficRecorder
+from .registry import get_registry
+from .scheduler import get_refresh_scheduler
+from .services import async_setup_services
 import logging
 
 LOGGER = logging.getLogger(__name__)
 PLATFORMS: list[Platform] = [
     Platform.LIGHT,
-    Platform.NUMBER
+    Platform.NUMBER,
+    Platform.SENSOR
 ]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the integration wide services."""
+    async_setup_services(hass)
+    return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up from a config entry."""
     config     = entry.data
     options    = entry.options
-    instance   = LEDNETWFInstance(entry.data[CONF_MAC], hass, config, options)
+    instance   = get_registry(hass).acquire(entry.data[CONF_MAC], config, options) # Reuses the config flow's or the previous load's instance if there is one
     # reset = entry.options.get(CONF_RESET, None) or entry.data.get(CONF_RESET, None)
     delay = entry.options.get(CONF_DELAY, None) or entry.data.get(CONF_DELAY, None)
     # LOGGER.debug("Config Reset data: %s and config delay data: %s", reset, delay)
+    if options.get(CONF_RECORD, False):
+        log_path = hass.config.path(FILES_DIR, f"{DOMAIN}_{instance.mac.replace(':', '')}.bin")
+        LOGGER.info("Recording BLE traffic for %s to %s", instance.mac, log_path)
+        instance._recorder = TrafficRecorder(hass, instance.mac, instance._model, log_path)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = instance
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
-
-    async def _async_stop(event: Event) -> None:
-        """Close the connection."""
-        await instance.stop()
-
+    if options.get(CONF_PERSISTENT, False):
+        instance.start_persistent_link()
     entry.async_on_unload(
-        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+        bluetooth.async_register_callback(
+            hass,
+            instance.async_handle_advertisement,
+            {"address": instance.mac},
+            bluetooth.BluetoothScanningMode.PASSIVE,
+        )
     )
+    entry.async_on_unload(get_refresh_scheduler(hass).async_add(instance))
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    # Disconnecting on shutdown is handled for every device at once by the idle reaper in scheduler.py
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -44,12 +65,14 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         instance = hass.data[DOMAIN][entry.entry_id]
-        await instance.stop()
+        await get_registry(hass).async_release(instance)
     hass.data[DOMAIN].pop(entry.entry_id)
     return unload_ok
 
 async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
     instance = hass.data[DOMAIN][entry.entry_id]
+    if instance._options == entry.options:
+        return # Already running with these, e.g. after the provision_led_settings service pushed them
     await instance.set_led_settings(entry.options)
     await hass.config_entries.async_reload(entry.entry_id)
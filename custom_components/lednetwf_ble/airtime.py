@@ -0,0 +1,176 @@
+import math
+import time
+from array import array
+
+from .scheduler import DEFAULT_ADAPTER
+
+DATA_AIRTIME          = "lednetwf_ble_airtime"
+AIRTIME_WINDOW        = 60.0 # Seconds of traffic the totals cover
+AIRTIME_BUCKETS       = 6    # The window rolls forward a bucket (10 seconds) at a time
+# Airtime is estimated, not measured.  The model is a 1M PHY link without data length extension, the worst case and what
+# the ESPHome proxies and most of these controllers use: every 27 byte link layer fragment costs its bytes plus 10 bytes
+# of preamble, access address, header and CRC at 8us a byte, followed by the empty acknowledgement and two inter frame
+# spaces.
+LL_MAX_FRAGMENT       = 27
+LL_OVERHEAD           = 10
+US_PER_BYTE           = 8
+FRAGMENT_TURNAROUND   = 150 + 80 + 150 # T_IFS, empty PDU, T_IFS
+ATT_L2CAP_OVERHEAD    = 4 + 3 # L2CAP header, ATT opcode and handle
+CONNECT_AIRTIME       = 3000 # us for a connection with cached services: CONNECT_IND, MTU exchange and the notify subscription
+COMMAND_NAMES         = {
+    0x3b: "power_and_colour",
+    0x38: "effect",
+    0x42: "effect",
+    0x41: "rgb_and_static_effect", # Strips set plain colours with a static effect too
+    0x73: "music_effect",
+    0x59: "pixels",
+    0x62: "led_settings",
+    0x81: "status_query",
+    0x63: "settings_query",
+}
+NOTIFICATION          = "notification"
+
+# Counters kept per bucket
+FRAMES_SENT, BYTES_SENT, NOTIFICATIONS, BYTES_RECEIVED, AIRTIME_US, CONNECTS, CONNECT_FAILURES, RETRIES = range(8)
+FIELDS = ("frames_sent", "bytes_sent", "notifications", "bytes_received", "airtime_us", "connects", "connect_failures", "retries")
+
+
+def estimate_airtime(length: int) -> int:
+    """Microseconds of radio time to carry one ATT write or notification of length bytes."""
+    pdu       = length + ATT_L2CAP_OVERHEAD
+    fragments = math.ceil(pdu / LL_MAX_FRAGMENT)
+    return (pdu + fragments * LL_OVERHEAD) * US_PER_BYTE + fragments * FRAGMENT_TURNAROUND
+
+
+def command_name(frame) -> str:
+    command = frame[8] if len(frame) > 8 else None
+    return COMMAND_NAMES.get(command) or (f"0x{command:02x}" if command is not None else "unknown")
+
+
+class RollingWindow:
+    """Counters over the last AIRTIME_WINDOW seconds, kept as a ring of buckets in one flat array."""
+
+    __slots__ = ("_epochs", "_counts")
+
+    def __init__(self) -> None:
+        self._epochs = array("q", [-1] * AIRTIME_BUCKETS)
+        self._counts = array("L", bytes(AIRTIME_BUCKETS * len(FIELDS) * array("L").itemsize))
+
+    def add(self, now: float, field: int, amount: int = 1) -> None:
+        epoch = int(now * AIRTIME_BUCKETS / AIRTIME_WINDOW)
+        slot  = epoch % AIRTIME_BUCKETS
+        base  = slot * len(FIELDS)
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            for index in range(base, base + len(FIELDS)):
+                self._counts[index] = 0
+        self._counts[base + field] += amount
+
+    def totals(self, now: float) -> dict[str, int]:
+        current = int(now * AIRTIME_BUCKETS / AIRTIME_WINDOW)
+        totals  = [0] * len(FIELDS)
+        for slot, epoch in enumerate(self._epochs):
+            if current - AIRTIME_BUCKETS < epoch <= current:
+                base = slot * len(FIELDS)
+                for field in range(len(FIELDS)):
+                    totals[field] += self._counts[base + field]
+        return dict(zip(FIELDS, totals))
+
+
+class AirtimeLedger:
+    """Accounts for the radio traffic of every device, rolled up per device, per adapter and per command type.
+
+    Each device's traffic is also broken down per command, so a chatty automation shows up as e.g. a lot of pixels or
+    power_and_colour airtime on one light.  Windows are only created once something is sent or received.
+    """
+
+    def __init__(self) -> None:
+        self._devices:  dict[str, RollingWindow] = {}
+        self._adapters: dict[str, RollingWindow] = {}
+        self._commands: dict[str, RollingWindow] = {}
+        self._device_commands: dict[str, dict[str, RollingWindow]] = {}
+
+    @staticmethod
+    def _window(windows: dict, key) -> RollingWindow:
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = RollingWindow()
+        return window
+
+    def _add(self, mac: str, adapter: str | None, field: int, amount: int = 1, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._window(self._devices, mac).add(now, field, amount)
+        self._window(self._adapters, adapter or DEFAULT_ADAPTER).add(now, field, amount)
+
+    def record_write(self, mac: str, adapter: str | None, data) -> None:
+        """Account for one GATT write, which may hold several frames if they were packed together."""
+        now     = time.monotonic()
+        airtime = estimate_airtime(len(data))
+        self._add(mac, adapter, BYTES_SENT, len(data), now)
+        self._add(mac, adapter, AIRTIME_US, airtime, now)
+        offset = 0
+        while offset < len(data):
+            length = 8 + data[offset + 5] if offset + 8 <= len(data) else len(data) - offset
+            name   = command_name(data[offset:offset + length])
+            share  = airtime * length // len(data) # Packed frames split the write's airtime by size
+            for window in (self._window(self._commands, name), self._window(self._device_commands.setdefault(mac, {}), name)):
+                window.add(now, FRAMES_SENT)
+                window.add(now, BYTES_SENT, length)
+                window.add(now, AIRTIME_US, share)
+            self._add(mac, adapter, FRAMES_SENT, 1, now)
+            offset += length
+
+    def record_notification(self, mac: str, adapter: str | None, data) -> None:
+        now     = time.monotonic()
+        airtime = estimate_airtime(len(data))
+        self._add(mac, adapter, NOTIFICATIONS, 1, now)
+        self._add(mac, adapter, BYTES_RECEIVED, len(data), now)
+        self._add(mac, adapter, AIRTIME_US, airtime, now)
+        window = self._window(self._commands, NOTIFICATION)
+        window.add(now, NOTIFICATIONS)
+        window.add(now, BYTES_RECEIVED, len(data))
+        window.add(now, AIRTIME_US, airtime)
+
+    def record_connect(self, mac: str, adapter: str | None, failed: bool = False) -> None:
+        now = time.monotonic()
+        self._add(mac, adapter, CONNECT_FAILURES if failed else CONNECTS, 1, now)
+        self._add(mac, adapter, AIRTIME_US, CONNECT_AIRTIME, now) # A failed attempt still advertises and scans
+
+    def record_retry(self, mac: str, adapter: str | None) -> None:
+        self._add(mac, adapter, RETRIES)
+
+    def device(self, mac: str) -> dict:
+        """Totals for one device over the window, with the per command breakdown."""
+        now    = time.monotonic()
+        window = self._devices.get(mac)
+        totals = window.totals(now) if window else dict.fromkeys(FIELDS, 0)
+        totals["commands"] = {name: commands.totals(now) for name, commands in self._device_commands.get(mac, {}).items()}
+        return totals
+
+    def adapter(self, adapter: str | None) -> dict:
+        window = self._adapters.get(adapter or DEFAULT_ADAPTER)
+        return window.totals(time.monotonic()) if window else dict.fromkeys(FIELDS, 0)
+
+    def as_dict(self) -> dict:
+        now = time.monotonic()
+        return {
+            "window":   AIRTIME_WINDOW,
+            "adapters": {adapter: window.totals(now) for adapter, window in self._adapters.items()},
+            "commands": {name: window.totals(now) for name, window in self._commands.items()},
+        }
+
+    def forget(self, mac: str) -> None:
+        """Drop a device's windows, e.g. when its config entry is removed."""
+        self._devices.pop(mac, None)
+        self._device_commands.pop(mac, None)
+
+
+def utilisation(airtime_us: int) -> float:
+    """Airtime as a percentage of the window."""
+    return round(airtime_us / (AIRTIME_WINDOW * 1e6) * 100, 2)
+
+
+def get_airtime(hass) -> AirtimeLedger:
+    if DATA_AIRTIME not in hass.data:
+        hass.data[DATA_AIRTIME] = AirtimeLedger()
+    return hass.data[DATA_AIRTIME]
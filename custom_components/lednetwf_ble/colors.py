@@ -0,0 +1,123 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Colour maths shared by the command and notification paths.  The devices scale RGB values by a brightness percentage
+# (0-100) rather than having a separate brightness control, so the same scaling is needed on every packet and the
+# reverse on every notification.  Both directions are precomputed here as 101 x 256 lookup tables.
+
+BRIGHTNESS_LUT = np.array(
+    [[max(0, min(255, int(component * percent / 100))) for component in range(256)] for percent in range(101)],
+    dtype=np.uint8,
+)
+# Recovering the original colour from a scaled one.  Percent 0 is treated as 1, as the notification handler always has.
+INVERSE_BRIGHTNESS_LUT = np.array(
+    [[max(0, min(255, int(component * 100 / max(percent, 1)))) for component in range(256)] for percent in range(101)],
+    dtype=np.uint8,
+)
+# The same tables as bytes, which are quicker to index from plain Python than a NumPy array
+_BRIGHTNESS_BYTES         = [bytes(row) for row in BRIGHTNESS_LUT]
+_INVERSE_BRIGHTNESS_BYTES = [bytes(row) for row in INVERSE_BRIGHTNESS_LUT]
+
+DEFAULT_GAMMA = 2.2
+# Chips which are known to need gamma correction to look linear.  Anything else is sent uncorrected.
+CHIP_GAMMA = {
+    "WS2812B":    DEFAULT_GAMMA,
+    "WS2812E":    DEFAULT_GAMMA,
+    "WS2811":     DEFAULT_GAMMA,
+    "SK6812":     DEFAULT_GAMMA,
+    "SK6812RGBW": DEFAULT_GAMMA,
+}
+
+
+def scale_rgb(rgb, percent: int) -> tuple[int, int, int]:
+    """Scale an RGB colour by a brightness percentage, the way the devices expect it."""
+    table = _BRIGHTNESS_BYTES[percent]
+    return (table[int(rgb[0])], table[int(rgb[1])], table[int(rgb[2])])
+
+
+def unscale_rgb(rgb, percent: int) -> tuple[int, int, int]:
+    """Recover the unscaled colour from RGB values reported by the device at a brightness percentage."""
+    table = _INVERSE_BRIGHTNESS_BYTES[percent]
+    return (table[int(rgb[0])], table[int(rgb[1])], table[int(rgb[2])])
+
+
+def scale_array(rgb: np.ndarray, percent: int) -> np.ndarray:
+    """Batch form of scale_rgb for any uint8 array of channel values."""
+    return BRIGHTNESS_LUT[percent][rgb]
+
+
+def unscale_array(rgb: np.ndarray, percent: int) -> np.ndarray:
+    return INVERSE_BRIGHTNESS_LUT[percent][rgb]
+
+
+@lru_cache(maxsize=8)
+def gamma_table(gamma: float) -> np.ndarray:
+    return np.array([round(255 * (value / 255) ** gamma) for value in range(256)], dtype=np.uint8)
+
+
+def chip_gamma_table(chip_type) -> np.ndarray | None:
+    """Gamma table for a chip type (enum member or name), or None if the chip doesn't need correcting."""
+    gamma = CHIP_GAMMA.get(getattr(chip_type, "name", chip_type))
+    return gamma_table(gamma) if gamma else None
+
+
+@lru_cache(maxsize=1024)
+def rgb_to_hsv(r, g, b) -> tuple[int, int, int]:
+    """RGB (0-255) to HSV as (0-359, 0-100, 0-100).
+
+    Same arithmetic as colorsys.rgb_to_hsv, so results are identical, without the extra calls.  Notifications tend to
+    repeat the same few colours so results are cached.
+    """
+    r, g, b = r / 255.0, g / 255.0, b / 255.0
+    maxc = max(r, g, b)
+    minc = min(r, g, b)
+    if minc == maxc:
+        return (0, 0, int(maxc * 100))
+    rangec = maxc - minc
+    s  = rangec / maxc
+    rc = (maxc - r) / rangec
+    gc = (maxc - g) / rangec
+    bc = (maxc - b) / rangec
+    if r == maxc:
+        h = bc - gc
+    elif g == maxc:
+        h = 2.0 + rc - bc
+    else:
+        h = 4.0 + gc - rc
+    h = (h / 6.0) % 1.0
+    return (int(h * 360), int(s * 100), int(maxc * 100))
+
+
+def rgb_to_hsv_array(rgb: np.ndarray) -> np.ndarray:
+    """Batch form of rgb_to_hsv for an (n, 3) array."""
+    rgb    = np.asarray(rgb, dtype=np.float64) / 255.0
+    maxc   = rgb.max(axis=-1)
+    minc   = rgb.min(axis=-1)
+    rangec = maxc - minc
+    grey   = rangec == 0
+    safe_range = np.where(grey, 1.0, rangec)
+    s  = np.where(grey, 0.0, rangec / np.where(maxc == 0, 1.0, maxc))
+    rc = (maxc - rgb[..., 0]) / safe_range
+    gc = (maxc - rgb[..., 1]) / safe_range
+    bc = (maxc - rgb[..., 2]) / safe_range
+    h  = np.where(rgb[..., 0] == maxc, bc - gc, np.where(rgb[..., 1] == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h  = np.where(grey, 0.0, (h / 6.0) % 1.0)
+    return np.stack([h * 360, s * 100, maxc * 100], axis=-1).astype(np.int32)
+
+
+def hsv_to_rgb_array(hsv: np.ndarray) -> np.ndarray:
+    """(n, 3) array of HSV as (0-360, 0-100, 0-100) to uint8 RGB, for rendering effects and groups."""
+    hsv = np.asarray(hsv, dtype=np.float64)
+    h   = (hsv[..., 0] % 360) / 60.0
+    s   = hsv[..., 1] / 100.0
+    v   = hsv[..., 2] / 100.0
+    i   = np.floor(h).astype(np.int32) % 6
+    f   = h - np.floor(h)
+    p   = v * (1.0 - s)
+    q   = v * (1.0 - s * f)
+    t   = v * (1.0 - s * (1.0 - f))
+    r   = np.choose(i, [v, q, p, p, t, v])
+    g   = np.choose(i, [t, v, v, q, p, p])
+    b   = np.choose(i, [p, p, t, v, v, q])
+    return (np.stack([r, g, b], axis=-1) * 255).astype(np.uint8)
@@ -1,7 +1,7 @@
 import logging
 import asyncio
 import voluptuous as vol
-from .lednetwf import LEDNETWFInstance
+from .registry import get_registry
 from typing import Any
 from bluetooth_data_tools import human_readable_name
 from homeassistant import config_entries
@@ -25,12 +25,16 @@ from .const import (
     CONF_LEDTYPE,
     CONF_COLORORDER,
     CONF_MODEL,
+    CONF_RECORD,
+    CONF_STATE_INTERVAL,
+    CONF_PERSISTENT,
+    CONF_JOURNAL_EXPIRY,
+    CONF_STATE_FRESHNESS,
     RING_LIGHT_MODEL,
     STRIP_LIGHT_MODEL,
-    LedTypes_StripLight,
-    LedTypes_RingLight,
     ColorOrdering
 )
+from .drivers import get_driver
 
 LOGGER = logging.getLogger(__name__)
 
@@ -158,8 +162,7 @@ class LEDNETWFFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                     ), errors={})
 
     async def toggle_light(self):
-        if not self._instance:
-            self._instance = LEDNETWFInstance(self.mac, self.hass)
+        self._instance = get_registry(self.hass).acquire(self.mac) # The same instance every retry, acquiring it again stops it expiring
         try:
             await self._instance.update()
             await self._instance.send_initial_packets()
@@ -171,7 +174,8 @@ class LEDNETWFFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         except (Exception) as error:
             return error
         finally:
-            await self._instance.stop()
+            # Keep the connection for the config entry, which takes the instance over once the flow finishes
+            await get_registry(self.hass).async_release(self._instance)
 
     @staticmethod
     @callback
@@ -199,14 +203,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         if user_input is not None:
             new_led_type    = user_input.get(CONF_LEDTYPE)
-            new_led_type    = LedTypes_StripLight[new_led_type].value if model == 0x56 else LedTypes_RingLight[new_led_type].value
+            new_led_type    = get_driver(model).chip_types[new_led_type].value
             new_color_order = user_input.get(CONF_COLORORDER)
             new_color_order = ColorOrdering[new_color_order].value
             self._options.update(user_input)
             return self.async_create_entry(title=self._config_entry.title, data=self._options)
         
         default_conf_delay = self._options.get(CONF_DELAY, self._data.get(CONF_DELAY, 120))
-        ledchiplist        = LedTypes_StripLight if model == 0x56 else LedTypes_RingLight
+        ledchiplist        = get_driver(model).chip_types
         ledchips_options   = [option.name for option in ledchiplist]
         colororder_options = [option.name for option in ColorOrdering]
 
@@ -216,6 +220,11 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(CONF_LEDCOUNT,   default=self._options.get(CONF_LEDCOUNT)):   cv.positive_int,
                 vol.Optional(CONF_LEDTYPE,    default=self._options.get(CONF_LEDTYPE)):    vol.In(ledchips_options),
                 vol.Optional(CONF_COLORORDER, default=self._options.get(CONF_COLORORDER)): vol.In(colororder_options),
+                vol.Optional(CONF_PERSISTENT, default=self._options.get(CONF_PERSISTENT, False)): bool,
+                vol.Optional(CONF_JOURNAL_EXPIRY, default=self._options.get(CONF_JOURNAL_EXPIRY, 60)): cv.positive_int,
+                vol.Optional(CONF_STATE_FRESHNESS, default=self._options.get(CONF_STATE_FRESHNESS, 30)): cv.positive_int,
+                vol.Optional(CONF_STATE_INTERVAL, default=self._options.get(CONF_STATE_INTERVAL, 0)): cv.positive_int,
+                vol.Optional(CONF_RECORD,     default=self._options.get(CONF_RECORD, False)): bool,
             }
         )
         return self.async_show_form(
@@ -1,6 +1,7 @@
 from enum import Enum
 
 DOMAIN            = "lednetwf_ble"
+FILES_DIR         = DOMAIN # Under the config directory.  Traffic logs and traces go here, and it's all the services can read or write.
 CONF_NAME         = "name"
 CONF_RESET        = "reset"
 CONF_DELAY        = "delay"
@@ -8,8 +9,15 @@ CONF_LEDCOUNT     = "ledcount"
 CONF_LEDTYPE      = "ledtype"
 CONF_COLORORDER   = "colororder"
 CONF_MODEL        = "model"
+CONF_RECORD       = "record_traffic"
+CONF_STATE_INTERVAL = "state_interval"
+CONF_PERSISTENT   = "persistent_link"
+CONF_JOURNAL_EXPIRY = "journal_expiry"
+CONF_STATE_FRESHNESS = "state_freshness"
 RING_LIGHT_MODEL  = 0x53
 STRIP_LIGHT_MODEL = 0x56
+DEFAULT_MTU       = 23 # Until the MTU exchange says otherwise
+ATT_OVERHEAD      = 3
 
 #EFFECT_OFF_HA = EFFECT_OFF
 
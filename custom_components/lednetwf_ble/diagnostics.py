@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import math
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_MAC
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_MAC}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    instance  = hass.data[DOMAIN][entry.entry_id]
+    state_age = instance.state_age
+    metrics   = instance.metrics
+    return {
+        "entry": {
+            "data":    async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "device": {
+            "model":          instance._model,
+            "adapter":        instance.adapter,
+            "is_on":          instance.is_on,
+            "color_mode":     instance.color_mode,
+            "effect":         instance.effect,
+            "state_is_fresh": instance.state_is_fresh,
+            "state_age":      round(state_age, 1) if math.isfinite(state_age) else None, # Never confirmed
+            "link_uptime":    instance.link_uptime,
+            "connect_success_rate": 1 - metrics["connect_failures"] / metrics["connect_attempts"] if metrics["connect_attempts"] else None,
+        },
+        "metrics": metrics,
+        "notifications": instance._framer.as_dict(),
+        "airtime": {
+            "device": instance._airtime.device(instance._mac),
+            **instance._airtime.as_dict(), # Every adapter and command type, for comparing this device with the rest
+        },
+        "timeline": instance.timeline,
+    }
@@ -0,0 +1,157 @@
+import logging
+from abc import ABC, abstractmethod
+
+from homeassistant.components.light import ColorMode
+
+from .const import (
+    EFFECT_MAP_0x53,
+    EFFECT_MAP_0x56,
+    RING_LIGHT_MODEL,
+    STRIP_LIGHT_MODEL,
+    LedTypes_RingLight,
+    LedTypes_StripLight,
+    ColorOrdering,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+EFFECT_STATIC = "static" # Effects which also take a colour, sent with 0x41
+EFFECT_MUSIC  = "music"  # Sound reactive effects, sent with 0x73
+EFFECT_PLAIN  = "effect" # Everything else, 0x38 on ring lights and 0x42 on strips
+STATIC_IDS    = range(0x0100, 0x1101) # How the effect maps in const encode static and music effects
+MUSIC_IDS     = range(0x2100, 0x4101)
+MUSIC_OFFSET  = 0x32
+
+DRIVERS: dict[int, "ModelDriver"] = {}
+
+
+class ModelDriver(ABC):
+    """Everything that differs between controller models.
+
+    One instance per model is built at import and shared by every device of that model.  The effect tables are worked
+    out up front so that looking an effect up, either way round, is a single dict lookup.  A driver that misses one of
+    the abstract methods fails when it's registered, rather than when a device first needs it.
+    """
+
+    model: int                  = 0
+    icon: str                   = "mdi:lightbulb"
+    color_modes: frozenset      = frozenset({ColorMode.RGB})
+    default_color_mode          = ColorMode.RGB
+    chip_types                  = LedTypes_StripLight
+    effect_map: dict[str, int]  = {}
+    status_speed_index          = 5  # Where the effect speed sits in a 0x81 status response in effects mode
+    advertised_speed_index      = 17 # And in the manufacturer data
+
+    def __init__(self) -> None:
+        self.effect_list = sorted(self.effect_map)
+        self.effect_index: dict[str, int] = {name: index for index, name in enumerate(self.effect_list)} # Position in effect_list
+        self.effects: dict[str, tuple[str, int]] = {} # name: (kind, id the device uses)
+        self.effect_names: dict[str, dict[int, str]] = {EFFECT_STATIC: {}, EFFECT_MUSIC: {}, EFFECT_PLAIN: {}}
+        for name, effect_id in self.effect_map.items():
+            if effect_id in STATIC_IDS:
+                kind, device_id = EFFECT_STATIC, effect_id >> 8
+            elif effect_id in MUSIC_IDS:
+                kind, device_id = EFFECT_MUSIC, (effect_id >> 8) - MUSIC_OFFSET
+            else:
+                kind, device_id = EFFECT_PLAIN, effect_id
+            self.effects[name] = (kind, device_id)
+            self.effect_names[kind][device_id] = name
+
+    def effect_name(self, kind: str, device_id: int, default: str = "Unknown") -> str:
+        return self.effect_names[kind].get(device_id, default)
+
+    @abstractmethod
+    def effect_packet(self, effect_id: int, speed: int, brightness_percent: int) -> bytearray:
+        ...
+
+    @abstractmethod
+    def led_settings_packet(self, led_count: int, chip_type: int, color_order: int) -> bytearray:
+        ...
+
+    @abstractmethod
+    def decode_settings(self, payload: bytearray) -> tuple | None:
+        """(led count, chip type, colour order) from a 0x63 settings response, or None if payload isn't one."""
+
+
+def register_driver(driver_class: type[ModelDriver]) -> type[ModelDriver]:
+    DRIVERS[driver_class.model] = driver_class()
+    return driver_class
+
+
+def get_driver(model: int) -> ModelDriver:
+    driver = DRIVERS.get(model)
+    if driver is None:
+        # Everything else seen so far has behaved like a strip controller
+        LOGGER.debug("No driver for model 0x%02X, treating it as a strip controller", model or 0)
+        driver = DRIVERS[STRIP_LIGHT_MODEL]
+    return driver
+
+
+@register_driver
+class RingLightDriver(ModelDriver):
+    model                  = RING_LIGHT_MODEL
+    icon                   = "mdi:lightbulb"
+    color_modes            = frozenset({ColorMode.COLOR_TEMP, ColorMode.HS})
+    default_color_mode     = ColorMode.HS
+    chip_types             = LedTypes_RingLight
+    effect_map             = EFFECT_MAP_0x53
+    status_speed_index     = 7
+    advertised_speed_index = 19
+
+    def effect_packet(self, effect_id: int, speed: int, brightness_percent: int) -> bytearray:
+        effect_packet     = bytearray.fromhex("00 00 80 00 00 04 05 0b 38 01 32 64")
+        effect_packet[9]  = effect_id
+        effect_packet[10] = speed
+        effect_packet[11] = brightness_percent
+        return effect_packet
+
+    def led_settings_packet(self, led_count: int, chip_type: int, color_order: int) -> bytearray:
+        led_settings_packet     = bytearray.fromhex("00 00 80 00 00 06 07 0a 62 00 0e 01 00 71")
+        led_settings_packet[10] = led_count & 0xFF
+        led_settings_packet[11] = chip_type
+        led_settings_packet[12] = color_order
+        led_settings_packet[13] = sum(led_settings_packet[8:12]) & 0xFF
+        return led_settings_packet
+
+    def decode_settings(self, payload: bytearray) -> tuple | None:
+        if payload[0] != 0x63:
+            return None
+        return payload[2], LedTypes_RingLight.from_value(payload[3]), ColorOrdering.from_value(payload[4])
+
+
+@register_driver
+class StripLightDriver(ModelDriver):
+    model                  = STRIP_LIGHT_MODEL
+    icon                   = "mdi:led-strip-variant"
+    color_modes            = frozenset({ColorMode.RGB})
+    default_color_mode     = ColorMode.RGB
+    chip_types             = LedTypes_StripLight
+    effect_map             = EFFECT_MAP_0x56
+    status_speed_index     = 5
+    advertised_speed_index = 17
+
+    def effect_packet(self, effect_id: int, speed: int, brightness_percent: int) -> bytearray:
+        effect_packet     = bytearray.fromhex("00 00 80 00 00 05 06 0b 42 01 32 64 d9")
+        effect_packet[9]  = effect_id
+        effect_packet[10] = speed
+        effect_packet[11] = brightness_percent
+        effect_packet[12] = sum(effect_packet[8:11]) & 0xFF
+        return effect_packet
+
+    def led_settings_packet(self, led_count: int, chip_type: int, color_order: int) -> bytearray:
+        led_settings_packet     = bytearray.fromhex("00 00 80 00 00 0b 0c 0b 62 00 64 00 03 01 00 64 03 f0 21")
+        led_count_bytes         = bytearray(led_count.to_bytes(2, byteorder='big'))
+        led_settings_packet[9], led_settings_packet[10]  = led_count_bytes
+        led_settings_packet[11], led_settings_packet[12] = [0,1] # We're only supporting a single segment
+        led_settings_packet[13] = chip_type
+        led_settings_packet[14] = color_order
+        led_settings_packet[15] = led_count & 0xFF
+        led_settings_packet[16] = 1 # 1 music mode segment, can support more in the app.
+        led_settings_packet[17] = sum(led_settings_packet[9:18]) & 0xFF
+        return led_settings_packet
+
+    def decode_settings(self, payload: bytearray) -> tuple | None:
+        if len(payload) < 8 or payload[1] != 0x63:
+            return None
+        led_count = int.from_bytes(payload[2:4], byteorder='big') * payload[5]
+        return led_count, LedTypes_StripLight.from_value(payload[6]), ColorOrdering.from_value(payload[7])
@@ -0,0 +1,98 @@
+import logging
+import re
+
+LOGGER = logging.getLogger(__name__)
+
+FRAMER_BUFFER  = 1024 # Bytes of incomplete response kept per device
+MAX_DOCUMENT   = 560  # Longest response that can be valid: a 255 byte payload as hex plus the JSON around it
+MIN_DOCUMENT   = 8    # Shortest: {"":"00"}, anything smaller isn't worth looking inside
+STATUS_COMMAND = 0x81
+STATUS_LENGTH  = 14
+
+# A document that could be valid: a quoted key straight after the opening brace, no braces inside and a length in range.
+# The whole buffer is scanned for these in one pass by the regex engine rather than candidate by candidate in Python.
+DOCUMENT = re.compile(rb'\{"[^{}]{%d,%d}\}' % (MIN_DOCUMENT - 2, MAX_DOCUMENT - 3))
+
+# The devices wrap every response in a small JSON document, {"code":0,"payload":"<hex>"}.  Long responses can be split
+# over several notifications, and nothing guarantees a notification starts at the beginning of a document, so the
+# notifications are treated as a byte stream and documents are cut out of it as they complete.
+
+
+class NotificationFramer:
+    """Reassembles response documents from a stream of notifications and returns their payloads.
+
+    At most FRAMER_BUFFER bytes are held.  Anything that can't be part of a valid document, i.e. bytes outside braces or
+    a document longer than MAX_DOCUMENT, is thrown away without being parsed, so the cost of decoding is bounded no
+    matter what the device sends.
+    """
+
+    def __init__(self, size: int = FRAMER_BUFFER, verify: bool = True) -> None:
+        self._buffer       = bytearray()
+        self._size         = size
+        self._verify       = verify
+        self.frames        = 0
+        self.dropped       = 0 # Bytes discarded
+        self.bad_checksums = 0
+
+    def feed(self, data) -> list[bytearray]:
+        """Add a notification to the stream.  Returns the payloads of any documents it completed."""
+        buffer = self._buffer
+        if not buffer and data[:1] == b"{" and data[-1:] == b"}" and len(data) < MAX_DOCUMENT and data.find(b"}") == len(data) - 1:
+            # The usual case, one whole document in one notification.  Skip the buffer.
+            payload = self._payload(bytes(data), 0, len(data) - 1)
+            return [payload] if payload is not None else []
+        if len(buffer) + len(data) > self._size:
+            # Only the last FRAMER_BUFFER bytes can be kept, don't copy in the rest just to throw it away
+            self.dropped += len(buffer) + len(data) - self._size
+            if len(data) >= self._size:
+                buffer[:] = data[len(data) - self._size:]
+            else:
+                del buffer[:len(buffer) + len(data) - self._size]
+                buffer += data
+        else:
+            buffer += data
+        payloads = []
+        position = 0
+        # Documents can only have been completed by a notification with a closing brace in it
+        for document in DOCUMENT.finditer(buffer) if b"}" in data else ():
+            start, end = document.span()
+            # Whatever came before it can't have been a document
+            self.dropped += start - position
+            payload = self._payload(buffer, start, end - 1)
+            if payload is not None:
+                payloads.append(payload)
+            position = end
+        # What's left is the start of a document still arriving.  Keep it from the last opening brace.
+        start = buffer.rfind(b"{", position)
+        if start < 0 or len(buffer) - start >= MAX_DOCUMENT or buffer.find(b"}", start) >= 0:
+            self.dropped += len(buffer) - position
+            buffer.clear()
+        else:
+            self.dropped += start - position
+            del buffer[:start]
+        return payloads
+
+    def _payload(self, buffer, start: int, end: int) -> bytearray | None:
+        """Payload of the document buffer[start:end + 1], the hex string between its last two quotes."""
+        last_quote  = buffer.rfind(b'"', start, end)
+        first_quote = buffer.rfind(b'"', start, last_quote) if last_quote > start else -1
+        if first_quote < 0:
+            self.dropped += end + 1 - start
+            return None
+        try:
+            payload = bytearray.fromhex(buffer[first_quote + 1:last_quote].decode("ascii"))
+        except (UnicodeDecodeError, ValueError):
+            self.dropped += end + 1 - start
+            return None
+        if not payload:
+            return None
+        if self._verify and payload[0] == STATUS_COMMAND:
+            if len(payload) < STATUS_LENGTH or payload[STATUS_LENGTH - 1] != sum(payload[:STATUS_LENGTH - 1]) & 0xFF:
+                LOGGER.debug("Dropping status response with a bad checksum: %s", payload.hex())
+                self.bad_checksums += 1
+                return None
+        self.frames += 1
+        return payload
+
+    def as_dict(self) -> dict:
+        return {"frames": self.frames, "dropped_bytes": self.dropped, "bad_checksums": self.bad_checksums}
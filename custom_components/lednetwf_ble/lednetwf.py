@@ -1,10 +1,11 @@
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from homeassistant.components import bluetooth
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.components.light import (ColorMode)
 from homeassistant.const import CONF_MAC
-from homeassistant.components.light import EFFECT_OFF
+from homeassistant.components.light import EFFECT_OFF, FLASH_LONG, FLASH_SHORT
 
 from bleak.backends.device import BLEDevice
 from bleak.backends.service import BleakGATTCharacteristic, BleakGATTServiceCollection
@@ -17,33 +18,37 @@ from bleak_retry_connector import (
     ble_device_has_changed,
     establish_connection,
 )
-from typing import Any, TypeVar, cast, Tuple
+from typing import Any, NamedTuple, TypeVar, cast, Tuple
 from collections.abc import Callable
 import traceback
 import logging
-import colorsys
+import time
 
 from .const import (
-    EFFECT_MAP_0x53,
-    EFFECT_LIST_0x53,
-    EFFECT_ID_TO_NAME_0x53,
-    EFFECT_MAP_0x56,
-    EFFECT_LIST_0x56,
-    EFFECT_ID_TO_NAME_0x56,
-    RING_LIGHT_MODEL,
-    STRIP_LIGHT_MODEL,
     CONF_LEDCOUNT,
     CONF_LEDTYPE,
     CONF_COLORORDER,
     CONF_LEDCOUNT,
     CONF_DELAY,
+    CONF_STATE_INTERVAL,
+    CONF_PERSISTENT,
+    CONF_JOURNAL_EXPIRY,
+    CONF_STATE_FRESHNESS,
     DOMAIN,
     CONF_NAME,
     CONF_MODEL,
-    LedTypes_StripLight,
-    LedTypes_RingLight,
+    DEFAULT_MTU,
+    ATT_OVERHEAD,
     ColorOrdering
 )
+from .drivers import get_driver, EFFECT_STATIC, EFFECT_MUSIC, EFFECT_PLAIN
+from .scheduler import get_limiter, get_reaper
+from .airtime import get_airtime
+from .tracing import get_tracer
+from .timeline import SOURCE_ADVERTISEMENT, SOURCE_COMMAND, SOURCE_NOTIFICATION, StateTimeline
+from .pixels import PixelStreamer
+from .framer import NotificationFramer
+from .colors import rgb_to_hsv, scale_rgb, unscale_rgb
 
 LOGGER = logging.getLogger(__name__)
 
@@ -54,8 +59,22 @@ NOTIFY_CHARACTERISTIC_UUIDS   = ["0000ff02-0000-1000-8000-00805f9b34fb"]
 INITIAL_PACKET                = bytearray.fromhex("00 01 80 00 00 04 05 0a 81 8a 8b 96")
 GET_LED_SETTINGS_PACKET       = bytearray.fromhex("00 02 80 00 00 05 06 0a 63 12 21 f0 86")
 DEFAULT_ATTEMPTS              = 3
+SETTINGS_TIMEOUT              = 3.0 # Seconds to wait for the 0x63 response after changing the LED settings
+STATUS_TIMEOUT                = 3.0 # Seconds a refresh waits for the 0x81 response before dropping the connection it opened
 BLEAK_BACKOFF_TIME            = 0.25
 RETRY_BACKOFF_EXCEPTIONS      = (BleakDBusError)
+DEFAULT_STATE_FRESHNESS       = 30   # Seconds for which device state read back from the device is trusted to skip redundant commands
+KEEPALIVE_INTERVAL            = 20.0 # Seconds between status queries on a persistent link
+RECONNECT_BACKOFF_MIN         = 0.5
+RECONNECT_BACKOFF_MAX         = 30.0
+DEFAULT_JOURNAL_EXPIRY        = 60   # Seconds a command that couldn't be delivered is kept for, waiting for the device to come back
+COLOR_ATTRIBUTES              = ("color_temp_kelvin", "hs_color", "rgb_color", "effect") # Only one of these can be in effect at once
+ADVERTISED_STATE              = slice(14, 22) # Power, mode, effect, speed/brightness, RGB and white bytes of the manufacturer data
+ROUTE_RSSI_MARGIN             = 6    # dB another adapter has to be stronger by before we move the device to it
+PACKING_PROBE_WINDOW          = 1.0  # Seconds to wait for status responses when checking whether the firmware accepts packed frames
+FLASH_PERIOD                  = 1.0  # Seconds for one off/on (or on/off) cycle of a flash
+FLASH_CYCLES                  = {FLASH_SHORT: 1, FLASH_LONG: 10}
+FLASH_LATENCY_WEIGHT          = 0.25 # How quickly the write latency estimate follows new measurements during a flash
 
 WrapFuncType = TypeVar("WrapFuncType", bound=Callable[..., Any])
 
@@ -85,6 +104,7 @@ def retry_bluetooth_connection_error(func: WrapFuncType) -> WrapFuncType:
                         exc_info=True,
                     )
                     raise
+                self._airtime.record_retry(self._mac, self._adapter)
                 LOGGER.debug(
                     "%s: %s error calling %s, backing off %ss, retrying (%s/%s)...",
                     self.name,
@@ -109,6 +129,7 @@ def retry_bluetooth_connection_error(func: WrapFuncType) -> WrapFuncType:
                         exc_info=True,
                     )
                     raise
+                self._airtime.record_retry(self._mac, self._adapter)
                 LOGGER.debug(
                     "%s: %s error calling %s, retrying  (%s/%s)...: %s",
                     self.name,
@@ -123,13 +144,69 @@ def retry_bluetooth_connection_error(func: WrapFuncType) -> WrapFuncType:
     return cast(WrapFuncType, _async_wrap_retry_bluetooth_connection_error)
 
 
-def rgb_to_hsv(r,g,b):
-    h, s, v = colorsys.rgb_to_hsv(r/255.0,g/255.0,b/255.0)
-    h, s, v = int(h*360), int(s*100), int(v*100)
-    return [h,s,v]
+def _same_on_device(wanted, current) -> bool:
+    # Colours read back from notifications are recovered from brightness scaled bytes, so they can be off by a
+    # rounding step.  Compare at the resolution the device actually has.
+    if current is None:
+        return False
+    return all(abs(int(a) - int(b)) <= 1 for a, b in zip(wanted, current))
+
+def _brightness_percent(brightness: int) -> int:
+    # What normalize_brightness sends, without touching any state
+    return int(max(2, min(brightness, 255)) * 100 / 255)
+
+def _percent_brightness(percent: int) -> int:
+    # The other way, rounding up so that _brightness_percent gives the same percentage back
+    return -(-int(percent) * 255 // 100)
+
+def build_frame(payload, checksum: bool = True, frame_type: int = 0x0b) -> bytearray:
+    """Wrap a command payload in the transport header.  The packet counter is filled in when the frame is sent."""
+    inner = bytearray(payload)
+    if checksum:
+        inner.append(sum(inner) & 0xFF)
+    if len(inner) > 0xFE:
+        raise ValueError(f"Payload too long for one frame: {len(inner)} bytes")
+    return bytearray([0x00, 0x00, 0x80, 0x00, 0x00, len(inner), len(inner) + 1, frame_type]) + inner
+
+def _advertised_state(manufacturer_data) -> bytes | None:
+    if not manufacturer_data:
+        return None
+    data = next(iter(manufacturer_data.values()))
+    return bytes(data[ADVERTISED_STATE]) if len(data) >= ADVERTISED_STATE.stop else None
+
+class StateSnapshot(NamedTuple):
+    """Immutable copy of the decoded device state, cheap to take and to compare."""
+    is_on:             bool | None
+    brightness:        int | None
+    color_mode:        Any
+    hs_color:          tuple | None
+    rgb_color:         tuple | None
+    color_temp_kelvin: float | None
+    effect:            str | None
+    effect_speed:      int
+    led_count:         int | None
+    chip_type:         Any
+    color_order:       Any
+
 
 class LEDNETWFInstance:
-    def __init__(self, mac, hass, data={}, options={}) -> None:
+    # Installations can have hundreds of these, so attributes live in slots rather than a per instance __dict__.  Anything
+    # shared between devices of a model (effect tables, colour modes, packet encoders) lives on self._driver.
+    __slots__ = (
+        "__weakref__", "loop", "_data", "_options", "_hass", "_mac", "_delay", "_device", "_connect_lock", "_client",
+        "_cached_services", "_expected_disconnect", "_packet_counter", "_is_on", "_hs_color", "_rgb_color", "_brightness",
+        "_effect", "_effect_speed", "_model", "_fw_major", "_fw_minor", "_driver", "_color_mode", "_write_uuid",
+        "_read_uuid", "_led_count", "_color_order", "_chip_type", "_color_temp_kelvin", "_on_update_callbacks",
+        "_update_handle", "_last_snapshot", "_state_interval", "_recorder", "_adapter", "_limiter", "_reaper",
+        "_confirmed_at", "_advertised_baseline", "_metrics", "_journal", "_journal_expiry", "_journal_task", "_state_freshness",
+        "_packing_supported", "_packing_probe", "_status_responses", "_persistent", "_link_task", "_link_lost",
+        "_connected_at", "_pixel_streamer", "_notification_taps", "_notification_callback", "_framer", "_sessions",
+        "_airtime", "_flash_generation", "_tracer", "_settings_waiter", "_status_waiter", "_timeline",
+    )
+    _min_color_temp_kelvin = 2700 # The same for every model so far
+    _max_color_temp_kelvin = 6500
+
+    def __init__(self, mac, hass, data={}, options={}, ble_device: BLEDevice | None = None, manufacturer_data: dict | None = None) -> None:
         self._data    = data
         self._options = options
         self._hass    = hass
@@ -140,19 +217,23 @@ class LEDNETWFInstance:
         # LOGGER.debug(f"Options: {self._options}")
         self.loop     = asyncio.get_running_loop()
         self._device:   BLEDevice | None = None
-        self._device  = bluetooth.async_ble_device_from_address(self._hass, self._mac)
-        # LOGGER.debug(f"INIT Device: {self._device}")
-        if not self._device:
-            raise ConfigEntryNotReady(
-                f"You need to add bluetooth integration (https://www.home-assistant.io/integrations/bluetooth) or couldn't find a nearby device with address: {self._mac}"
-            )
-        service_info  = bluetooth.async_last_service_info(self._hass, self._mac).as_dict()
-        LOGGER.debug(f"Service info: {service_info}")
-        LOGGER.debug(f"Service info keys: {service_info.keys()}")
+        if ble_device is not None and manufacturer_data is not None:
+            # Used by the simulator and the replay tool, which don't have a real device to look up
+            self._device  = ble_device
+            service_info  = {'manufacturer_data': manufacturer_data, 'source': None}
+        else:
+            self._device  = bluetooth.async_ble_device_from_address(self._hass, self._mac)
+            # LOGGER.debug(f"INIT Device: {self._device}")
+            if not self._device:
+                raise ConfigEntryNotReady(
+                    f"You need to add bluetooth integration (https://www.home-assistant.io/integrations/bluetooth) or couldn't find a nearby device with address: {self._mac}"
+                )
+            service_info  = bluetooth.async_last_service_info(self._hass, self._mac).as_dict()
+            LOGGER.debug(f"Service info: {service_info}")
+            LOGGER.debug(f"Service info keys: {service_info.keys()}")
 
         self._connect_lock: asyncio.Lock = asyncio.Lock()
         self._client: BleakClientWithServiceCache | None = None
-        self._disconnect_timer: asyncio.TimerHandle | None = None
         self._cached_services: BleakGATTServiceCollection | None = None
         self._expected_disconnect   = False
         self._packet_counter        = 0
@@ -162,17 +243,51 @@ class LEDNETWFInstance:
         self._brightness            = 255
         self._effect                = EFFECT_OFF # 2024.2 this indicates HA that we support effects and they are currently off
         self._effect_speed          = 0x64 # 0-100% speed
-        self._min_color_temp_kelvin = 2700
-        self._max_color_temp_kelvin = 6500
         self._model                 = self._detect_model(service_info['manufacturer_data'])
-        self._color_mode            = ColorMode.HS if self._model == RING_LIGHT_MODEL else ColorMode.RGB
+        self._color_mode            = self._driver.default_color_mode
         self._write_uuid            = None
         self._read_uuid             = None
         self._led_count             = options.get(CONF_LEDCOUNT, None)
         self._color_order           = options.get(CONF_COLORORDER, None)
         self._chip_type             = options.get(CONF_LEDTYPE, None)
         self._color_temp_kelvin     = None
-        self._on_update_callbacks = []
+        self._on_update_callbacks: list[Callable[[], None]] = []
+        self._update_handle: asyncio.Handle | None = None
+        self._last_snapshot: StateSnapshot | None = None # What listeners were last told about
+        self._state_interval        = self._options.get(CONF_STATE_INTERVAL, 0) / 1000 # ms in the options, 0 means once per event loop tick
+        self._recorder              = None # TrafficRecorder, set up by __init__ when traffic recording is enabled in the options
+        self._adapter               = service_info.get('source') # The adapter or proxy that last heard the device
+        self._limiter               = get_limiter(hass)
+        self._reaper                = get_reaper(hass) # Disconnects us once we've been idle for self._delay
+        self._reaper.register(self)
+        self._airtime               = get_airtime(hass) # Radio traffic accounting, shared by every device
+        self._tracer                = get_tracer(hass)  # Timing spans, only recorded while a capture is running
+        self._settings_waiter: asyncio.Future | None = None # Set while push_led_settings waits for the device to report its settings
+        self._status_waiter: asyncio.Future | None = None   # And while a refresh waits for the status
+        self._timeline              = StateTimeline() # Recent state transitions, for diagnostics and the export_timeline service
+        self._confirmed_at          = time.monotonic() # Advertisement data counts as a confirmation of the device state
+        self._advertised_baseline   = _advertised_state(service_info['manufacturer_data']) # What the device advertised when its state was last confirmed
+        self._metrics               = {"commands": 0, "packets": 0, "skipped": 0, "connects": 0, "reconnects": 0, "link_drops": 0,
+                                       "journaled": 0, "journal_replays": 0, "journal_expired": 0, "refreshes": 0, "handoffs": 0,
+                                       "connect_attempts": 0, "connect_failures": 0, "route_changes": 0, "flashes": 0}
+        self._journal: dict[str, tuple[Any, float]] = {} # Latest undelivered value per attribute: state, brightness and color
+        self._journal_expiry        = self._options.get(CONF_JOURNAL_EXPIRY, DEFAULT_JOURNAL_EXPIRY)
+        self._state_freshness       = self._options.get(CONF_STATE_FRESHNESS, DEFAULT_STATE_FRESHNESS)
+        self._journal_task: asyncio.Task | None = None
+        self._packing_supported: bool | None = None # Whether the firmware handles several frames in one write.  None until probed.
+        self._packing_probe: asyncio.Task | None = None
+        self._status_responses      = 0
+        self._persistent            = self._options.get(CONF_PERSISTENT, False)
+        self._link_task: asyncio.Task | None = None
+        self._link_lost: asyncio.Event | None = None # Only needed, and so only created, for persistent links
+        self._connected_at: float | None = None
+        self._pixel_streamer: PixelStreamer | None = None
+        self._notification_taps: tuple[Callable[[bytearray], None], ...] = () # Almost always empty, a tuple shares the one empty instance
+        self._notification_callback = None
+        self._framer                = NotificationFramer()
+        self._sessions              = 0 # Open session() blocks.  While there are any the connection is pinned.
+        self._flash_generation      = 0 # Bumped by every command, so a running flash knows it has been overtaken
+        self._record_transition(SOURCE_ADVERTISEMENT) # What the advertisement said at startup, as decoded by _detect_model
 
         LOGGER.debug(
             "Model information for device %s : ModelNo %s. MAC: %s",
@@ -181,6 +296,24 @@ class LEDNETWFInstance:
             self._mac,
         )
 
+    def reconfigure(self, data: dict, options: dict) -> None:
+        """Take on the data and options of a (re)loaded config entry, keeping the connection and the decoded state."""
+        self._data           = data
+        self._options        = options
+        self._delay          = self._options.get(CONF_DELAY, self._data.get(CONF_DELAY, 120))
+        self._led_count      = self._options.get(CONF_LEDCOUNT, self._led_count)
+        self._color_order    = self._options.get(CONF_COLORORDER, self._color_order)
+        self._chip_type      = self._options.get(CONF_LEDTYPE, self._chip_type)
+        self._state_interval = self._options.get(CONF_STATE_INTERVAL, 0) / 1000
+        self._journal_expiry = self._options.get(CONF_JOURNAL_EXPIRY, DEFAULT_JOURNAL_EXPIRY)
+        self._state_freshness = self._options.get(CONF_STATE_FRESHNESS, DEFAULT_STATE_FRESHNESS)
+        self._persistent     = self._options.get(CONF_PERSISTENT, False)
+        if not self._persistent and self._link_task is not None:
+            self._link_task.cancel()
+            self._link_task = None
+        if self._client and self._client.is_connected:
+            self._reset_disconnect_timer() # The delay may have changed
+
     def log(self, text):
         LOGGER.debug(f"  *** {self._mac} : \t {text}")
 
@@ -199,6 +332,7 @@ class LEDNETWFInstance:
         # 2025.3 Setting color mode as UNKNOWN will avoid throwing error on unsupported color mode
 
         self._fw_major   = manu_data_data[0]
+        self._driver     = get_driver(self._fw_major)
         self._fw_minor   = f'{manu_data_data[8]:02X}{manu_data_data[9]:02X}.{manu_data_data[10]:02X}'
         self._led_count  = manu_data_data[24]
         self._is_on      = True if manu_data_data[14] == 0x23 else False
@@ -208,13 +342,13 @@ class LEDNETWFInstance:
             if manu_data_data[16] == 0xf0:
                 # RGB Mode 
                 r,g,b = manu_data_data[18], manu_data_data[19], manu_data_data[20]
-                if self._fw_major == RING_LIGHT_MODEL:
+                if self._driver.default_color_mode == ColorMode.HS:
                     self._rgb_color = (r,g,b)
                     hsv              = rgb_to_hsv(r,g,b)
                     self._hs_color   = (hsv[0],hsv[1])
-                    self._brightness = int(hsv[2] * 255 // 100)
-                    self._color_mode = ColorMode.HS if self._fw_major == RING_LIGHT_MODEL else ColorMode.RGB
-                if self._fw_major == STRIP_LIGHT_MODEL:
+                    self._brightness = _percent_brightness(hsv[2])
+                    self._color_mode = ColorMode.HS
+                else:
                     self._color_mode   = ColorMode.RGB
                     self._rgb_color = (manu_data_data[18], manu_data_data[19], manu_data_data[20])
             elif manu_data_data[16] == 0x0f:
@@ -222,18 +356,18 @@ class LEDNETWFInstance:
                 color_temp = manu_data_data[21] # 00=warm, 64=cold
                 white_bri = manu_data_data[17]
                 self._color_temp_kelvin = self._min_color_temp_kelvin + color_temp * (self._max_color_temp_kelvin - self._min_color_temp_kelvin) / 100 # CoPilot did this, is it right?
-                self._brightness = int(white_bri * 255 // 100)
+                self._brightness = _percent_brightness(white_bri)
                 self._color_mode = ColorMode.COLOR_TEMP
             else:
                 self._rgb_color = (manu_data_data[18], manu_data_data[19], manu_data_data[20])
                 hsv              = rgb_to_hsv(*self._rgb_color)
                 self._hs_color   = (hsv[0],hsv[1])
-                self._brightness = int(hsv[2] * 255 // 100)
+                self._brightness = _percent_brightness(hsv[2])
                 self._color_mode = ColorMode.RGB
                 self._effect_speed = manu_data_data[17]
-                if self._fw_major == STRIP_LIGHT_MODEL:
+                if self._driver.effect_names[EFFECT_STATIC]:
                     if 0x02 <= manu_data_data[16] <= 0x0a:
-                        self._effect = EFFECT_ID_TO_NAME_0x56[manu_data_data[16] << 8]
+                        self._effect = self._driver.effect_name(EFFECT_STATIC, manu_data_data[16])
                     else:
                         self._effect = EFFECT_OFF
                     # TODO: Detect music mode
@@ -244,16 +378,15 @@ class LEDNETWFInstance:
             self._color_mode = ColorMode.BRIGHTNESS
             effect = manu_data_data[16]
             self.log(f"Effect: {effect}")
-            scaled_effect = (effect + 0x32) << 8
-            self._effect = EFFECT_ID_TO_NAME_0x56[scaled_effect]
+            self._effect = self._driver.effect_name(EFFECT_MUSIC, effect)
 
         if manu_data_data[15] == 0x25:
                 # Effects mode
                 effect             = manu_data_data[16]
                 # TODO: How does this work with static and music effects?
-                self._effect       = EFFECT_ID_TO_NAME_0x53[effect] if self._fw_major == RING_LIGHT_MODEL else EFFECT_ID_TO_NAME_0x56[effect]
-                self._effect_speed = manu_data_data[19]             if self._fw_major == RING_LIGHT_MODEL else manu_data_data[17]
-                self._brightness   = int(manu_data_data[18] * 255 // 100)
+                self._effect       = self._driver.effect_name(EFFECT_PLAIN, effect)
+                self._effect_speed = manu_data_data[self._driver.advertised_speed_index]
+                self._brightness   = _percent_brightness(manu_data_data[18])
                 self._color_mode   = ColorMode.BRIGHTNESS
 
         self.log(f"DM:\t\t LED count:    {self._led_count}")
@@ -270,43 +403,57 @@ class LEDNETWFInstance:
     async def _write(self, data: bytearray):
         """Send command to device and read response."""
         await self._ensure_connected()
+        self._stamp(data)
+        await self._write_while_connected(data)
+
+    def _stamp(self, data: bytearray) -> bytearray:
+        """Fill in the packet counter."""
         if self._packet_counter > 65535:
             self._packet_counter = 0
         data[0] = (0xFF00 & self._packet_counter) >> 8
         data[1] = 0x00FF & self._packet_counter
         self._packet_counter += 1
-        await self._write_while_connected(data)
+        return data
 
     async def _write_while_connected(self, data: bytearray):
         self.log(f"Writing data to {self.name}: {' '.join([f'{byte:02X}' for byte in data])}")
-        await self._client.write_gatt_char(self._write_uuid, data, False)
+        if self._recorder is not None:
+            self._recorder.record_sent(data)
+        self._airtime.record_write(self._mac, self._adapter, data)
+        with self._tracer.span("gatt_write", self._mac):
+            await self._client.write_gatt_char(self._write_uuid, data, False)
     
     def _notification_handler(self, _sender: BleakGATTCharacteristic, data: bytearray) -> None:
         # Response data is decoded here:  https://github.com/8none1/zengge_lednetwf#response-data
         #TODO: If nothing has changed, bail out early
         """Handle BLE notifications from the device.  Update internal state to reflect the device state."""
+        if self._recorder is not None:
+            self._recorder.record_received(data)
+        self._airtime.record_notification(self._mac, self._adapter, data)
+        for tap in self._notification_taps:
+            tap(data)
         self.log(f"N: {self.name}: Notification received")
         self.log(f"N: Device info: {self._model, self.name, self._mac}")
-        response_str = data.decode("utf-8", errors="ignore")
-        last_quote = response_str.rfind('"')
-        if last_quote > 0:
-            first_quote = response_str.rfind('"', 0, last_quote)
-            if first_quote > 0:
-                payload = response_str[first_quote+1:last_quote]
-            else:
-                return None
-        else:
-            return None
-        payload = bytearray.fromhex(payload)
+        with self._tracer.span("notification", self._mac):
+            for payload in self._framer.feed(data):
+                self._handle_payload(payload)
+
+    def _handle_payload(self, payload: bytearray) -> None:
+        """Update internal state from one complete response payload."""
         self.log(f"N: Response Payload: {' '.join([f'{byte:02X}' for byte in payload])}")
         if payload[0] == 0x81:
             # Status update response. TODO: Look up 0x81 (129d) in jadx
             self.log("N: Status response received")
+            self._status_responses += 1
+            if self._status_waiter is not None and not self._status_waiter.done():
+                self._status_waiter.set_result(None)
+            self._confirmed_at = time.monotonic()
+            self._advertised_baseline = None # Whatever it advertises next reflects this state
             power           = payload[2]
             mode            = payload[3]
             selected_effect = payload[4]
             led_count       = payload[12]
-            # checksum = payload[13] # TODO: Implement checksum checking?
+            # payload[13] is the checksum, already checked by the framer
             self._is_on = True if power == 0x23 else False
 
             if mode == 0x61:
@@ -315,7 +462,7 @@ class LEDNETWFInstance:
                     hsv = rgb_to_hsv(payload[6],payload[7],payload[8])
                     self._color_mode = ColorMode.HS
                     self._hs_color = (hsv[0],hsv[1])
-                    self._brightness = int(hsv[2] * 255 // 100)
+                    self._brightness = _percent_brightness(hsv[2])
                     self._color_temp_kelvin = None
                     self._effect = EFFECT_OFF
                 if selected_effect == 0x0f:
@@ -326,7 +473,7 @@ class LEDNETWFInstance:
                     self._hs_color = None
                     self._effect = EFFECT_OFF
                     self._color_temp_kelvin = color_temp_kelvin
-                    self._brightness = int(payload[5] * 255 // 100)
+                    self._brightness = _percent_brightness(payload[5])
                 if selected_effect == 0x01:
                     # RGB mode
                     # RGB mode and brightness are a bit of a complex problem.  HA send us the colour and brightness separately.  i.e. the RGB colour coming in from HA
@@ -343,60 +490,40 @@ class LEDNETWFInstance:
                     self._effect            = EFFECT_OFF
                     rgb_in = tuple(payload[6:9])
                     brightness_percent = max(self.normalize_brightness(self._brightness),1)
-                    self._rgb_color = tuple(max(0, min(255, int(component * 100 / brightness_percent))) for component in rgb_in)
+                    self._rgb_color = unscale_rgb(rgb_in, brightness_percent)
                 if 0x02 <= selected_effect <= 0x0a:
                     # "Static" effects from strip lights
                     self._color_mode = ColorMode.RGB
-                    effect = selected_effect << 8 # Shift back to the numbers defined in the effect map in const
-                    self._effect = EFFECT_ID_TO_NAME_0x56[effect]
+                    self._effect = self._driver.effect_name(EFFECT_STATIC, selected_effect)
                     self._effect_speed = payload[5]  
             
             if mode == 0x62:
                 # Music effects mode from strip lights
                 self._color_mode = ColorMode.BRIGHTNESS
-                effect = payload[4]
-                scaled_effect = (effect + 0x32) << 8
-                try:
-                    self._effect = EFFECT_ID_TO_NAME_0x56[scaled_effect]
-                except KeyError:
-                    self._effect = "Unknown"
+                self._effect = self._driver.effect_name(EFFECT_MUSIC, payload[4])
                 
 
             if mode == 0x25:
                 self.log("N: Effects mode")
-                EFFECT_ID_TO_NAME = EFFECT_ID_TO_NAME_0x53 if self._model == RING_LIGHT_MODEL else EFFECT_ID_TO_NAME_0x56
-                try:
-                    effect_name = EFFECT_ID_TO_NAME[selected_effect]
-                except KeyError:
+                effect_name = self._driver.effect_name(EFFECT_PLAIN, selected_effect, None)
+                if effect_name is None:
                     self.log("N: \t Effect name not found")
                     effect_name = "Unknown"
                 self._effect = effect_name
-                speed = payload[7] if self._model == RING_LIGHT_MODEL else payload[5]
+                speed = payload[self._driver.status_speed_index]
                 self._color_mode = ColorMode.BRIGHTNESS # 2024.2 Allows setting color mode for changing effects brightness
-                self._brightness = int(payload[6] * 255 // 100)
+                self._brightness = _percent_brightness(payload[6])
                 self._effect_speed = speed # Speed 0-100
                 self.log(f"N: \t Brightness (0-255): {self._brightness}")
                 self.log(f"N: \t Effect speed (0-100): {self._effect_speed}")
+            self._record_transition(SOURCE_NOTIFICATION)
 
-        if self._model == RING_LIGHT_MODEL:
-            if payload[0] == 0x63:
-                self.log("N: LED settings packet: Ring device")
-                led_count         = payload[2]
-                chip_type         = payload[3]
-                colour_order      = payload[4]
-                self._led_count   = led_count
-                self._chip_type   = LedTypes_RingLight.from_value(chip_type)
-                self._color_order = ColorOrdering.from_value(colour_order)
-
-        if self._model == STRIP_LIGHT_MODEL:
-            if payload[1] == 0x63:
-                led_count = bytes([payload[2], payload[3]])
-                led_count = int.from_bytes(led_count, byteorder='big') * payload[5]
-                chip_type = payload[6]
-                colour_order = payload[7]
-                self._led_count = led_count
-                self._chip_type = LedTypes_StripLight.from_value(chip_type)
-                self._color_order = ColorOrdering.from_value(colour_order)
+        settings = self._driver.decode_settings(payload)
+        if settings is not None:
+            self.log(f"N: LED settings packet: model 0x{self._driver.model:02X}")
+            self._led_count, self._chip_type, self._color_order = settings
+            if self._settings_waiter is not None and not self._settings_waiter.done():
+                self._settings_waiter.set_result(settings)
         
         self.log(f"N: \t Is on: {self._is_on}")
         self.log(f"N: \t HS Color: {self._hs_color}")
@@ -408,17 +535,17 @@ class LEDNETWFInstance:
         self.log(f"N: \t Color temp kelvin: {self._color_temp_kelvin}")
         self.log(f"N: \t LED count: {self._led_count}")
 
-        self.local_callback()
+        self.schedule_update()
 
     async def send_initial_packets(self):
         # Send initial packets to device to see if it sends notifications
         self.log("Send initial packets")
-        await self._write(INITIAL_PACKET)
+        await self._write(bytearray(INITIAL_PACKET))
         if not self._chip_type:
             # We should only need to get this once, since config is immutable.
             # All future changes of this data will come via the config flow.
             self.log(f"Sending GET_LED_SETTINGS_PACKET to {self.name}")
-            await self._write(GET_LED_SETTINGS_PACKET)
+            await self._write(bytearray(GET_LED_SETTINGS_PACKET))
     
     @property
     def mac(self):
@@ -432,6 +559,10 @@ class LEDNETWFInstance:
     def name(self):
         return self._device.name
 
+    @property
+    def adapter(self):
+        return self._adapter
+
     @property
     def rssi(self):
         return self._device.rssi
@@ -466,10 +597,11 @@ class LEDNETWFInstance:
     
     @property
     def effect_list(self) -> list[str]:
-        if self._model == RING_LIGHT_MODEL:
-            return EFFECT_LIST_0x53
-        else:
-            return EFFECT_LIST_0x56
+        return self._driver.effect_list
+
+    @property
+    def driver(self):
+        return self._driver
 
     @property
     def effect(self):
@@ -481,39 +613,46 @@ class LEDNETWFInstance:
 
     @retry_bluetooth_connection_error
     async def set_color_temp_kelvin(self, value: int, new_brightness: int):
-        # White colours are represented by colour temperature percentage from 0x0 to 0x64 from warm to cool
-        # Warm (0x0) is only the warm white LED, cool (0x64) is only the cool white LED and then a mixture between the two
         if value is None or new_brightness is None:
             return
+        await self._write(self._color_temp_packet(value, new_brightness))
+
+    def _color_temp_packet(self, value: int, new_brightness: int) -> bytearray:
+        # White colours are represented by colour temperature percentage from 0x0 to 0x64 from warm to cool
+        # Warm (0x0) is only the warm white LED, cool (0x64) is only the cool white LED and then a mixture between the two
         value = max(self._min_color_temp_kelvin, min(value, self._max_color_temp_kelvin))
         self._color_temp_kelvin = value
         brightness_percent = self.normalize_brightness(new_brightness)
 
-        color_temp_percent = int(
-            ((value - self._min_color_temp_kelvin) * 100)
-            / (self._max_color_temp_kelvin - self._min_color_temp_kelvin)
-        )
+        color_temp_percent = self._color_temp_percent(value)
         
         # Color temp packet + brightness
         color_temp_kelvin_packet = bytearray.fromhex("00 10 80 00 00 0d 0e 0b 3b b1 00 00 00 00 00 00 00 00 00 00 3d")
         color_temp_kelvin_packet[13] = color_temp_percent
         color_temp_kelvin_packet[14] = brightness_percent
-        await self._write(color_temp_kelvin_packet)
         self._color_mode = ColorMode.COLOR_TEMP
         self._effect = EFFECT_OFF
+        return color_temp_kelvin_packet
+
+    def _color_temp_percent(self, kelvin: float) -> int:
+        """Colour temperature as the device takes it, 0 (warm) to 100 (cool)."""
+        kelvin = max(self._min_color_temp_kelvin, min(kelvin, self._max_color_temp_kelvin))
+        return int(((kelvin - self._min_color_temp_kelvin) * 100) / (self._max_color_temp_kelvin - self._min_color_temp_kelvin))
 
     @retry_bluetooth_connection_error
     async def set_hs_color(self, hs: Tuple[int, int], new_brightness: int):
-        # The device expects basic static colour information in HSV format.
-        # The value for the Hue element is divided by two to fit in to a single byte.
-        # Saturation and Value are percentages from 0 to 100 (0x64).
-        # Value = Brightness
         if hs is None:
             self.log("HS is None")
             return
         else:
             self.log(f"HS is {hs}")
+        await self._write(self._hs_packet(hs, new_brightness))
 
+    def _hs_packet(self, hs: Tuple[int, int], new_brightness: int) -> bytearray:
+        # The device expects basic static colour information in HSV format.
+        # The value for the Hue element is divided by two to fit in to a single byte.
+        # Saturation and Value are percentages from 0 to 100 (0x64).
+        # Value = Brightness
         self._color_mode = ColorMode.HS
         self._hs_color = hs
         self._rgb_color = None
@@ -526,10 +665,13 @@ class LEDNETWFInstance:
         color_hs_packet[10] = hue
         color_hs_packet[11] = saturation
         color_hs_packet[12] = brightness_percent
-        await self._write(color_hs_packet)
+        return color_hs_packet
 
     @retry_bluetooth_connection_error
     async def set_rgb_color(self, rgb: Tuple[int, int, int], new_brightness: int):
+        await self._write(self._rgb_packet(rgb, new_brightness))
+
+    def _rgb_packet(self, rgb: Tuple[int, int, int], new_brightness: int) -> bytearray:
         # The strip light devices on firmware 0x56 support RGB colours via a different command
         # RGB colour handling is difficult on these devices because they don't implement a separate brightness control.  Instead, the RGB values are scaled by the brightness percentage.
         # This means we have to try and recover brightness from the RGB values sent back by the notification.  If the values drop below a certain threshold all colour information is
@@ -543,7 +685,7 @@ class LEDNETWFInstance:
         self._hs_color = None
         self._brightness = new_brightness
         brightness_percent = self.normalize_brightness(new_brightness)
-        rgb = tuple(max(0, min(255, int(component * brightness_percent / 100))) for component in rgb)
+        rgb = scale_rgb(rgb, brightness_percent)
         background_col = [0,0,0] # Consider adding support for this in the future?  For now, set black
         rgb_packet = bytearray.fromhex("00 00 80 00 00 0d 0e 0b 41 02 ff 00 00 00 00 00 32 00 00 f0 64")
         rgb_packet[9]  = 0 # Mode "0" leaves the static current mode unchanged.  If we want this to switch the device back to an actual static RGB mode change this to 1.
@@ -555,46 +697,42 @@ class LEDNETWFInstance:
         rgb_packet[16]    = self._effect_speed
         rgb_packet[20]    = sum(rgb_packet[8:19]) & 0xFF # Checksum
         self.log(f"Set RGB. RGB {self._rgb_color} Brightness {self._brightness}")
-        await self._write(rgb_packet)
+        return rgb_packet
         
     @retry_bluetooth_connection_error
     async def set_effect(self, effect: str, new_brightness: int):
-        EFFECT_LIST = EFFECT_LIST_0x53 if self._model == RING_LIGHT_MODEL else EFFECT_LIST_0x56
-        EFFECT_MAP  = EFFECT_MAP_0x53  if self._model == RING_LIGHT_MODEL else EFFECT_MAP_0x56
-        if effect not in EFFECT_LIST or effect is EFFECT_OFF:
+        effect_packet = self._effect_packet(effect, new_brightness)
+        if effect_packet is not None:
+            await self._write(effect_packet)
+
+    def _effect_packet(self, effect: str, new_brightness: int) -> bytearray | None:
+        if effect not in self._driver.effects or effect is EFFECT_OFF:
             LOGGER.error(f"Effect {effect} not supported or effect off called")
-            return
+            return None
         
         self._effect       = effect
         self.log(f"Setting effect: {effect}")
         brightness_percent = self.normalize_brightness(new_brightness)
-        effect_id          = EFFECT_MAP.get(effect)
-        self.log(f"Effect ID: {effect_id}")
+        kind, effect_id    = self._driver.effects[effect] # effect_id is already shifted back to what the device uses
+        self.log(f"Effect ID: {effect_id} ({kind})")
         if self._rgb_color is None:
             # We haven't set a colour yet, so set it to red
             self._rgb_color = (255,0,0)
 
-        if 0x0100 <= effect_id <= 0x1100: # See const for the meaning of these values.
+        if kind == EFFECT_STATIC:
             # We are dealing with "static" special effect numbers
-            self.log(f"'Static' effect: {effect_id}")
-            effect_id = effect_id >> 8 # Shift back to the actual effect id
-            self.log(f"Special effect after shifting: {effect_id}")
             effect_packet = bytearray.fromhex("00 00 80 00 00 0d 0e 0b 41 02 ff 00 00 00 00 00 32 00 00 f0 64")
-            rgb = tuple(max(0, min(255, int(component * brightness_percent / 100))) for component in self._rgb_color)
+            rgb = scale_rgb(self._rgb_color, brightness_percent)
             effect_packet[9] = effect_id
             effect_packet[10:13] = rgb
             effect_packet[16] = self._effect_speed
             effect_packet[20] = sum(effect_packet[8:19]) & 0xFF # checksum
             self.log(f"static effect packet : {' '.join([f'{byte:02X}' for byte in effect_packet])}")
-            await self._write(effect_packet)
-            return
+            return effect_packet
         
-        if 0x2100 <= effect_id <= 0x4100: # Music mode.
+        if kind == EFFECT_MUSIC:
             # We are dealing with a music mode effect
             effect_packet = bytearray.fromhex("00 22 80 00 00 0d 0e 0b 73 00 26 01 ff 00 00 ff 00 00 20 1a d2")
-            self.log(f"Music effect: {effect_id}")
-            effect_id = (effect_id >> 8) - 0x32 # Shift back to the actual effect id
-            self.log(f"Music effect after shifting: {effect_id}")
             effect_packet[9]     = 1 # On
             effect_packet[11]    = effect_id
             effect_packet[12:15] = self._rgb_color
@@ -603,17 +741,10 @@ class LEDNETWFInstance:
             effect_packet[19]    = brightness_percent
             effect_packet[20]    = sum(effect_packet[8:19]) & 0xFF
             self.log(f"music effect packet : {' '.join([f'{byte:02X}' for byte in effect_packet])}")
-            await self._write(effect_packet)
-            return
+            return effect_packet
         
-        effect_packet     = bytearray.fromhex("00 00 80 00 00 04 05 0b 38 01 32 64") if self._model == RING_LIGHT_MODEL else bytearray.fromhex("00 00 80 00 00 05 06 0b 42 01 32 64 d9")
         self._color_mode  = ColorMode.BRIGHTNESS # 2024.2 Allows setting color mode for changing effects brightness.  Effects above here support RGB, so only set here.
-        effect_packet[9]  = effect_id
-        effect_packet[10] = self._effect_speed # TODO: Support variable speeds.
-        effect_packet[11] = brightness_percent
-        if self._model == STRIP_LIGHT_MODEL:
-            effect_packet[12] = sum(effect_packet[8:11]) & 0xFF
-        await self._write(effect_packet)
+        return self._driver.effect_packet(effect_id, self._effect_speed, brightness_percent) # TODO: Support variable speeds.
 
     @retry_bluetooth_connection_error
     async def set_effect_speed(self, speed):
@@ -625,13 +756,414 @@ class LEDNETWFInstance:
 
     @retry_bluetooth_connection_error
     async def turn_on(self):
-        await self._write(bytearray.fromhex("00 01 80 00 00 0d 0e 0b 3b 23 00 00 00 00 00 00 00 32 00 00 90"))
-        self._is_on = True
+        await self._write(self._power_packet(True))
     
     @retry_bluetooth_connection_error
     async def turn_off(self):
-        await self._write(bytearray.fromhex("00 01 80 00 00 0d 0e 0b 3b 24 00 00 00 00 00 00 00 32 00 00 91"))
-        self._is_on = False
+        await self._write(self._power_packet(False))
+
+    def _power_packet(self, on: bool) -> bytearray:
+        self._is_on = on
+        if on:
+            return bytearray.fromhex("00 01 80 00 00 0d 0e 0b 3b 23 00 00 00 00 00 00 00 32 00 00 90")
+        return bytearray.fromhex("00 01 80 00 00 0d 0e 0b 3b 24 00 00 00 00 00 00 00 32 00 00 91")
+
+    async def flash(self, pattern: str = FLASH_SHORT) -> dict:
+        """Flash the light FLASH_CYCLES[pattern] times and leave it as it was.
+
+        The connection is pinned for the whole flash and every power frame is released against a fixed monotonic
+        schedule, early by the measured write latency, so frames land on time and lateness never accumulates.  Returns
+        how far the frames landed from their deadlines.  Any other command sent meanwhile ends the flash where it is.
+        If a frame fails to send the light is put back as it was before the error is raised.
+        """
+        self._flash_generation += 1
+        generation = self._flash_generation
+        was_on     = self._is_on
+        prior      = was_on is not False # Flash an unknown light as if it were on
+        on, off    = self._power_packet(True), self._power_packet(False)
+        self._is_on = was_on
+        frames     = [(False, off) if n % 2 == prior else (True, on) for n in range(1, 2 * FLASH_CYCLES.get(pattern, 1) + 1)]
+        errors     = []
+        async with self.session():
+            start = time.monotonic()
+            await self._write(bytearray(INITIAL_PACKET)) # Wakes the link up and gives a first latency estimate
+            latency = time.monotonic() - start
+            start   = time.monotonic() + latency # The first frame needs the same head start as the rest
+            finished = False
+            try:
+                for n, (state, frame) in enumerate(frames):
+                    deadline = start + n * FLASH_PERIOD / 2
+                    await asyncio.sleep(deadline - latency - time.monotonic())
+                    if self._flash_generation != generation:
+                        self.log("Flash overtaken by another command")
+                        break
+                    sent = time.monotonic()
+                    await self._write_while_connected(self._stamp(bytearray(frame)))
+                    self._is_on = state # Kept true to the device, so a command that overtakes the flash plans from here
+                    landed  = time.monotonic()
+                    self.record_command(landed - sent)
+                    latency = latency + FLASH_LATENCY_WEIGHT * (landed - sent - latency)
+                    errors.append(landed - deadline)
+                finished = True
+            finally:
+                if not finished and self._flash_generation == generation:
+                    # Cut short part way, e.g. a write failed.  Put the light back as it was, unless a newer command owns it now.
+                    try:
+                        await self._write(bytearray(on if prior else off))
+                        self._is_on = prior
+                    except Exception as error:
+                        self.log(f"Unable to restore the light after the flash: {error}")
+                        self.mark_state_stale()
+        self._metrics["flashes"] += 1
+        self._metrics["packets"] += len(errors)
+        self.schedule_update()
+        return {
+            "frames":     len(errors),
+            "overtaken":  len(errors) < len(frames),
+            "mean_error": sum(abs(error) for error in errors) / len(errors) if errors else None,
+            "max_error":  max(abs(error) for error in errors) if errors else None,
+        }
+
+    @property
+    def state_is_fresh(self) -> bool:
+        """True if the device state was confirmed by the device recently enough to diff commands against."""
+        return self.state_age <= self._state_freshness
+
+    @property
+    def state_age(self) -> float:
+        """Seconds since the device last confirmed our idea of its state, by a status notification or an advertisement."""
+        confirmed_at = self._confirmed_at
+        service_info = bluetooth.async_last_service_info(self._hass, self._mac, connectable=False) if self._hass else None
+        if service_info is not None and self._advertisement_agrees(service_info):
+            confirmed_at = max(confirmed_at, service_info.time)
+        return max(time.monotonic() - confirmed_at, 0.0)
+
+    def _advertisement_agrees(self, service_info) -> bool:
+        """Compare an advertisement with the state we last confirmed.  A mismatch means something else changed the device."""
+        state = _advertised_state(service_info.manufacturer_data)
+        if state is None:
+            return False
+        if self._advertised_baseline is None:
+            if service_info.time < self._confirmed_at:
+                return False # Sent before the last status notification, so it could be out of date
+            self._advertised_baseline = state
+            return True
+        if state == self._advertised_baseline:
+            return True
+        if self._confirmed_at != float("-inf"):
+            # e.g. the remote or the phone app.  Don't trust anything we know until the device reports in again.
+            self.log("Advertised state changed, marking state as stale")
+            self._confirmed_at = float("-inf")
+        return False
+
+    async def async_refresh_state(self) -> None:
+        """Ask the device for its status.  The answer comes back as a notification.
+
+        If the device wasn't connected, the connection is dropped again as soon as the answer is in, rather than holding
+        one of the adapter's slots for the whole disconnect delay.  Unless something else has used it meanwhile.
+        """
+        self._metrics["refreshes"] += 1
+        was_connected = self.is_connected
+        self._status_waiter = self.loop.create_future()
+        try:
+            await self._write(bytearray(INITIAL_PACKET))
+            counter = self._packet_counter
+            if not was_connected:
+                await asyncio.wait_for(self._status_waiter, STATUS_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.log("State refresh got no answer")
+        except BLEAK_EXCEPTIONS as error:
+            self.log(f"State refresh failed: {error}")
+            return
+        finally:
+            self._status_waiter = None
+        if not was_connected and self._packet_counter == counter and not self._sessions and not self._persistent:
+            await self._execute_disconnect()
+
+    @property
+    def metrics(self) -> dict:
+        return self._metrics
+
+    def plan_state(self, target: dict, force: bool = False) -> list[bytearray]:
+        """Work out the shortest list of packets that takes the device from its known state to target.
+
+        target uses the same keys as a light service call: state ("on"/"off"), brightness, color_temp_kelvin, hs_color,
+        rgb_color and effect, plus effect_speed (0-100) to go with an effect.  Internal state is updated as if the packets
+        had been sent; send_planned marks it stale again if they aren't.  If force is set, or the known state is too old to trust, everything in target is sent whether it
+        looks redundant or not.
+        """
+        self._flash_generation += 1 # A new command, any flash in progress stops where it is
+        force   = force or not self.state_is_fresh
+        packets = []
+        if target.get("state", "on") == "off":
+            if force or self._is_on is not False:
+                packets.append(self._power_packet(False))
+            return self._count_plan(packets)
+        if force or not self._is_on:
+            packets.append(self._power_packet(True))
+
+        brightness         = target.get("brightness", self._brightness)
+        percent            = _brightness_percent(brightness or 255)
+        # Brightness read back from a notification is rebuilt from a percentage, sometimes by way of RGB, so compare what
+        # the device would be sent, allowing a step either way like _same_on_device
+        brightness_changed = force or (brightness is not None and (self._brightness is None or not _same_on_device((percent,), (_brightness_percent(self._brightness),))))
+        if "color_temp_kelvin" in target:
+            if (brightness_changed or self._color_mode != ColorMode.COLOR_TEMP or self._color_temp_kelvin is None
+                    or self._color_temp_percent(target["color_temp_kelvin"]) != self._color_temp_percent(self._color_temp_kelvin)):
+                packets.append(self._color_temp_packet(target["color_temp_kelvin"], brightness))
+        elif "hs_color" in target:
+            hs = tuple(target["hs_color"])
+            if brightness_changed or self._color_mode != ColorMode.HS or not _same_on_device((hs[0] / 2, hs[1]), (self._hs_color[0] / 2, self._hs_color[1]) if self._hs_color else None):
+                packets.append(self._hs_packet(hs, brightness))
+        elif "rgb_color" in target:
+            rgb = tuple(target["rgb_color"])
+            current = tuple(component * percent / 100 for component in self._rgb_color) if self._rgb_color else None
+            if brightness_changed or self._color_mode != ColorMode.RGB or not _same_on_device(tuple(component * percent / 100 for component in rgb), current):
+                packets.append(self._rgb_packet(rgb, brightness))
+        elif target.get("effect", EFFECT_OFF) != EFFECT_OFF:
+            speed = target.get("effect_speed", self._effect_speed)
+            if brightness_changed or target["effect"] != self._effect or speed != self._effect_speed:
+                self._effect_speed = speed
+                packet = self._effect_packet(target["effect"], brightness)
+                if packet is not None:
+                    packets.append(packet)
+        elif brightness_changed:
+            # Only the brightness changes, so resend whatever the light is currently showing at the new level
+            if self._effect is not None and self._effect != EFFECT_OFF:
+                packet = self._effect_packet(self._effect, brightness)
+                if packet is not None:
+                    packets.append(packet)
+            elif self._color_mode == ColorMode.COLOR_TEMP:
+                packets.append(self._color_temp_packet(self._color_temp_kelvin, brightness))
+            elif self._color_mode == ColorMode.HS and self._hs_color is not None:
+                packets.append(self._hs_packet(self._hs_color, brightness))
+            else:
+                packets.append(self._rgb_packet(self._rgb_color, brightness))
+        return self._count_plan(packets)
+
+    def _count_plan(self, packets: list[bytearray]) -> list[bytearray]:
+        if packets:
+            self._metrics["commands"] += 1
+            self._metrics["packets"]  += len(packets)
+        else:
+            self._metrics["skipped"]  += 1
+            self.log("Skipping command, the device is already in the requested state")
+        return packets
+
+    async def set_pixels(self, frame, new_brightness: int | None = None, gamma: bool = False) -> int:
+        """Show a (led_count, 3) array of RGB values on a strip, one colour per LED.  Returns the number of packets sent.
+
+        gamma applies gamma correction for the configured chip type, where it is known to need it.  When streaming, wrap the
+        frames in session() to keep the connection pinned.
+        """
+        if self._pixel_streamer is None:
+            self._pixel_streamer = PixelStreamer(self)
+        return await self._pixel_streamer.async_send_frame(frame, new_brightness, gamma)
+
+    async def apply_state(self, target: dict, force: bool = False) -> None:
+        """Send only what is needed to bring the device to target.  See plan_state.
+
+        If the device can't be reached the target is journaled and sent when it comes back, instead of raising.
+        """
+        await self.send_planned(target, self.plan_state(target, force))
+
+    async def send_planned(self, target: dict, packets: list[bytearray]) -> None:
+        """Send packets planned for target, journaling target if the device can't be reached."""
+        if not packets:
+            return
+        started = time.monotonic()
+        try:
+            await self.write_packets(packets)
+        except BLEAK_EXCEPTIONS as error:
+            if not self._journal_expiry:
+                self.mark_state_stale()
+                raise
+            LOGGER.warning("%s: Unable to reach device, will send the command when it is back: %s", self.name, error)
+            self.journal_state(target)
+            return
+        except BaseException:
+            self.mark_state_stale() # e.g. cancelled part way through, so who knows what the device got
+            raise
+        self._discard_journal(target)
+        self.record_command(time.monotonic() - started)
+
+    def journal_state(self, target: dict) -> None:
+        """Remember an undelivered target, keeping only the latest value of each attribute."""
+        now = time.monotonic()
+        if "state" in target:
+            self._journal["state"] = (target["state"], now)
+        if "brightness" in target:
+            self._journal["brightness"] = (target["brightness"], now)
+        for attr in COLOR_ATTRIBUTES:
+            if attr in target:
+                self._journal["color"] = ((attr, target[attr]), now)
+        self._metrics["journaled"] += 1
+        self.mark_state_stale()
+
+    def mark_state_stale(self) -> None:
+        """plan_state has already applied a command which didn't get through.  Our idea of the device state is now just
+        what we wish it was, so don't skip anything, e.g. a retry of the same command, until the device reports in again."""
+        self._confirmed_at = float("-inf")
+
+    def _discard_journal(self, target: dict) -> None:
+        # A newer command got through, so anything journaled for the same attributes is out of date
+        if not self._journal:
+            return
+        if "state" in target:
+            self._journal.pop("state", None)
+        if "brightness" in target:
+            self._journal.pop("brightness", None)
+        if any(attr in target for attr in COLOR_ATTRIBUTES):
+            self._journal.pop("color", None)
+
+    def _pending_state(self) -> dict:
+        """The net journaled target, dropping anything older than the expiry."""
+        now    = time.monotonic()
+        target = {}
+        for key, (value, queued_at) in list(self._journal.items()):
+            if now - queued_at > self._journal_expiry:
+                del self._journal[key]
+                self._metrics["journal_expired"] += 1
+            elif key == "color":
+                target[value[0]] = value[1]
+            else:
+                target[key] = value
+        return target
+
+    def replay_journal(self) -> None:
+        """Send journaled commands now that the device looks reachable again.  Safe to call often."""
+        if not self._journal or (self._journal_task is not None and not self._journal_task.done()):
+            return
+        self._journal_task = self._hass.async_create_background_task(self._async_replay_journal(), f"lednetwf_ble journal {self._mac}")
+
+    async def _async_replay_journal(self) -> None:
+        snapshot = dict(self._journal)
+        target   = self._pending_state()
+        if not target:
+            return
+        self.log(f"Replaying journaled state: {target}")
+        started = time.monotonic()
+        try:
+            await self.write_packets(self.plan_state(target, force=True))
+        except BLEAK_EXCEPTIONS as error:
+            self.log(f"Journal replay failed, keeping it for later: {error}")
+            return
+        self.record_command(time.monotonic() - started)
+        self._metrics["journal_replays"] += 1
+        for key, entry in snapshot.items():
+            # Leave anything journaled while we were sending
+            if self._journal.get(key) is entry:
+                del self._journal[key]
+        self.schedule_update()
+
+    def async_handle_advertisement(self, service_info, change) -> None:
+        """Bluetooth callback for advertisements from this device."""
+        if not self._advertisement_agrees(service_info) and self._confirmed_at == float("-inf"):
+            # Changed by something else.  Only the power is worth decoding, the next status notification has the rest.
+            state = _advertised_state(service_info.manufacturer_data)
+            if state is not None:
+                self._timeline.record(SOURCE_ADVERTISEMENT, state[0] == 0x23 if state[0] in (0x23, 0x24) else None)
+        if service_info.connectable and not self.is_connected:
+            # While connected the route is whatever the connection went through, moving now would only show the wrong adapter
+            if service_info.source == self._adapter:
+                self._update_route(service_info.device, service_info.source)
+            else:
+                self._best_ble_device() # Heard through another adapter, only move if it's clearly the stronger one
+        if self._journal:
+            self.replay_journal()
+
+    async def send_raw(self, frames: list[bytearray], pacing: float = 0.0, window: float = 1.0) -> list[bytearray]:
+        """Send frames built with build_frame over one connection and return the raw notifications received.
+
+        pacing is the gap between frames in seconds, window how long to keep listening after the last one.
+        """
+        received = []
+        tap      = received.append
+        self._notification_taps += (tap,)
+        try:
+            async with self.session():
+                for n, frame in enumerate(frames):
+                    if n and pacing:
+                        await asyncio.sleep(pacing)
+                    await self._write(frame)
+                if window:
+                    await asyncio.sleep(window)
+        finally:
+            self._notification_taps = tuple(other for other in self._notification_taps if other is not tap)
+        return received
+
+    def _update_route(self, ble_device: BLEDevice, source: str | None) -> None:
+        if source != self._adapter or ble_device_has_changed(self._device, ble_device):
+            self.log(f"Route changed from {self._adapter} to {source}")
+            self._metrics["route_changes"] += 1
+        self._device  = ble_device
+        self._adapter = source
+
+    def _best_ble_device(self) -> BLEDevice:
+        """The BLEDevice for the strongest connectable route to the device.  Also called by establish_connection between attempts."""
+        if bluetooth.async_last_service_info(self._hass, self._mac) is None:
+            return self._device # Not heard since startup, or no Bluetooth integration at all as with the simulator
+        scanner_devices = bluetooth.async_scanner_devices_by_address(self._hass, self._mac, connectable=True)
+        if scanner_devices:
+            rssi    = lambda scanner_device: scanner_device.advertisement.rssi or -127
+            best    = max(scanner_devices, key=rssi)
+            current = next((scanner_device for scanner_device in scanner_devices if scanner_device.scanner.source == self._adapter), None)
+            if current is not None and rssi(best) < rssi(current) + ROUTE_RSSI_MARGIN:
+                best = current # Not enough better to be worth moving, two adapters at similar strength would flap otherwise
+            self._update_route(best.ble_device, best.scanner.source)
+        return self._device
+
+    @retry_bluetooth_connection_error
+    async def write_packets(self, packets: list[bytearray]) -> None:
+        """Send a list of packets back to back over a single connection.
+
+        If the firmware accepts it, as many frames as fit in the MTU are packed into each GATT write.  Otherwise the
+        writes are pipelined, each one is handed to the stack without waiting for the previous one to complete.
+        """
+        await self._ensure_connected()
+        if len(packets) == 1:
+            await self._write(packets[0])
+            return
+        for packet in packets:
+            self._stamp(packet)
+        if self._packing_supported:
+            limit = (getattr(self._client, "mtu_size", None) or DEFAULT_MTU) - ATT_OVERHEAD
+            batch = bytearray()
+            for packet in packets:
+                if batch and len(batch) + len(packet) > limit:
+                    await self._write_while_connected(batch)
+                    batch = bytearray()
+                batch += packet
+            await self._write_while_connected(batch)
+        else:
+            # Tasks start in the order they are created, so the writes still go out in order
+            await asyncio.gather(*[self.loop.create_task(self._write_while_connected(packet)) for packet in packets])
+
+    async def _async_probe_packing(self, counter: int) -> None:
+        """Find out whether the firmware handles more than one frame per write, by packing two status queries together.
+
+        counter is the packet counter when the connection came up.  Other commands get status responses too, so if
+        anything else is sent between then and the end of the window the count can't be trusted and we try again later.
+        """
+        if self._packet_counter != counter:
+            return # Something was written before we got here, its response may still be on the way
+        responses = self._status_responses
+        probe = self._stamp(bytearray(INITIAL_PACKET)) + self._stamp(bytearray(INITIAL_PACKET))
+        stamped = self._packet_counter
+        try:
+            await self._write_while_connected(probe)
+        except BLEAK_EXCEPTIONS as error:
+            self.log(f"Frame packing probe failed: {error}")
+            return
+        await asyncio.sleep(PACKING_PROBE_WINDOW)
+        answered = self._status_responses - responses
+        if self._packet_counter != stamped:
+            self.log("Frame packing probe overlapped other commands, will try again on the next connection")
+            return
+        if answered:
+            # No answer at all tells us nothing, try again on the next connection
+            self._packing_supported = answered >= 2
+            self.log(f"Firmware {'accepts' if self._packing_supported else 'does not accept'} packed frames")
 
     @retry_bluetooth_connection_error
     async def set_led_settings(self, options: dict):
@@ -653,35 +1185,34 @@ class LEDNETWFInstance:
             self._color_order       = color_order
             self._led_count         = led_count
 
-        if self._model == RING_LIGHT_MODEL:
-            chip_type           = getattr(LedTypes_RingLight, chip_type).value
-        elif self._model == STRIP_LIGHT_MODEL:
-            chip_type           = getattr(LedTypes_StripLight, chip_type).value
-        
+        chip_type               = getattr(self._driver.chip_types, chip_type).value
         color_order             = getattr(ColorOrdering, color_order).value
-
-        if self._model == STRIP_LIGHT_MODEL:
-            led_settings_packet     = bytearray.fromhex("00 00 80 00 00 0b 0c 0b 62 00 64 00 03 01 00 64 03 f0 21")
-            led_count_bytes         = bytearray(led_count.to_bytes(2, byteorder='big'))
-            led_settings_packet[9], led_settings_packet[10]  = led_count_bytes
-            led_settings_packet[11], led_settings_packet[12] = [0,1] # We're only supporting a single segment
-            led_settings_packet[13] = chip_type
-            led_settings_packet[14] = color_order
-            led_settings_packet[15] = led_count & 0xFF
-            led_settings_packet[16] = 1 # 1 music mode segment, can support more in the app.
-            led_settings_packet[17] = sum(led_settings_packet[9:18]) & 0xFF
-        if self._model == RING_LIGHT_MODEL:
-            led_settings_packet     = bytearray.fromhex("00 00 80 00 00 06 07 0a 62 00 0e 01 00 71")
-            led_settings_packet[10] = led_count & 0xFF
-            led_settings_packet[11] = chip_type
-            led_settings_packet[12] = color_order
-            led_settings_packet[13] = sum(led_settings_packet[8:12]) & 0xFF
+        led_settings_packet     = self._driver.led_settings_packet(led_count, chip_type, color_order)
 
         self.log(f"LED settings packet: {' '.join([f'{byte:02X}' for byte in led_settings_packet])}")
         await self._write(led_settings_packet)
-        await self._write(GET_LED_SETTINGS_PACKET)
-        await self.stop()
+        await self._write(bytearray(GET_LED_SETTINGS_PACKET))
+        # Stay connected.  The reload that follows hands this instance, link and all, to the new entry through the registry,
+        # and the reaper disconnects it once it's been idle for the delay.
     
+    @retry_bluetooth_connection_error
+    async def push_led_settings(self, packet: bytearray) -> tuple | None:
+        """Send a ready made 0x62 LED settings packet, then read the settings back.
+
+        Returns (led count, chip type, colour order) as the device reports them in its 0x63 response, or None if it
+        didn't answer within SETTINGS_TIMEOUT.  Used by bulk provisioning, which builds one packet per model and setting.
+        """
+        self._settings_waiter = self.loop.create_future()
+        try:
+            async with self.session():
+                await self._write(packet)
+                await self._write(bytearray(GET_LED_SETTINGS_PACKET))
+                return await asyncio.wait_for(self._settings_waiter, SETTINGS_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._settings_waiter = None
+
     @retry_bluetooth_connection_error
     async def update(self):
         # Called when HA starts up and wants the devices to initialise themselves
@@ -693,8 +1224,28 @@ class LEDNETWFInstance:
             track = traceback.format_exc()
             self.log(track)
 
+    @asynccontextmanager
+    async def session(self):
+        """Hold the connection open across a batch of operations.
+
+        Connects once on the way in.  Inside the block writes go straight to the client without the connection checks,
+        and the disconnect timer is left alone until the last open session ends.  Sessions can be nested and shared
+        by concurrent callers.  If the link drops inside a session the next write reconnects as usual.
+        """
+        await self._ensure_connected()
+        self._sessions += 1
+        self._reaper.cancel(self)
+        try:
+            yield self
+        finally:
+            self._sessions -= 1
+            if not self._sessions and self._client and self._client.is_connected:
+                self._reset_disconnect_timer()
+
     async def _ensure_connected(self) -> None:
         """Ensure connection to device is established."""
+        if self._sessions and self._client and self._client.is_connected:
+            return # Pinned by a session
         self.log(f"{self.name}: Ensure connected")
         if self._connect_lock.locked():
             self.log(f"ES {self.name}: Connection already in progress, waiting for it to complete")
@@ -703,34 +1254,60 @@ class LEDNETWFInstance:
             self._reset_disconnect_timer()
             return
 
+        queued = time.monotonic()
         async with self._connect_lock:
             # Check again while holding the lock
             if self._client and self._client.is_connected:
                 self._reset_disconnect_timer()
                 return
             self.log(f"{self.name}: Connecting")
-            client = await establish_connection(
-                BleakClientWithServiceCache,
-                self._device,
-                self.name,
-                self._disconnected,
-                cached_services=self._cached_services,
-                ble_device_callback=lambda: self._device,
-            )
+            device = self._best_ble_device()
+            self._metrics["connect_attempts"] += 1
+            async with self._limiter.slot(self._adapter, reserved=self._persistent):
+                self._tracer.record("connect_queue", self._mac, queued, time.monotonic()) # Waiting on our lock and the adapter's slots
+                try:
+                    with self._tracer.span("connect", self._mac):
+                        client = await establish_connection(
+                            BleakClientWithServiceCache,
+                            device,
+                            self.name,
+                            self._disconnected,
+                            cached_services=self._cached_services,
+                            ble_device_callback=self._best_ble_device,
+                        )
+                except Exception:
+                    self._metrics["connect_failures"] += 1
+                    self._airtime.record_connect(self._mac, self._adapter, failed=True)
+                    raise
+            self._airtime.record_connect(self._mac, self._adapter)
             self.log(f"{self.name}: Connected")
+            await self._setup_client(client)
+
+    async def _setup_client(self, client) -> None:
+        """Resolve characteristics and subscribe to notifications on a freshly connected client."""
+        with self._tracer.span("resolve_services", self._mac):
             resolved = self._resolve_characteristics(client.services)
             if not resolved:
                 # Try to handle services failing to load
                 resolved = self._resolve_characteristics(await client.get_services())
-            self._cached_services = client.services if resolved else None
+        self._cached_services = client.services if resolved else None
 
-            self._client = client
-            self._reset_disconnect_timer()
+        self._client = client
+        self._limiter.connected(self._adapter, self._mac)
+        counter = self._packet_counter # Callers can write as soon as the client is set, the packing probe needs to know
+        self._connected_at = time.monotonic()
+        self._metrics["connects"] += 1
+        self._reset_disconnect_timer()
 
-            # Subscribe to notification is needed for LEDnetWF devices to accept commands
-            self._notification_callback = self._notification_handler
+        # Subscribe to notification is needed for LEDnetWF devices to accept commands
+        self._notification_callback = self._notification_handler
+        with self._tracer.span("start_notify", self._mac):
             await client.start_notify(self._read_uuid, self._notification_callback)
-            self.log(f"{self.name}: Subscribed to notifications")
+        self.log(f"{self.name}: Subscribed to notifications")
+        if self._packing_supported is None and (self._packing_probe is None or self._packing_probe.done()):
+            self._packing_probe = self._hass.async_create_background_task(self._async_probe_packing(counter), f"lednetwf_ble packing probe {self._mac}")
+        if self._journal:
+            self.replay_journal()
 
     def _resolve_characteristics(self, services: BleakGATTServiceCollection) -> bool:
         """Resolve characteristics."""
@@ -745,53 +1322,152 @@ class LEDNETWFInstance:
         return bool(self._read_uuid and self._write_uuid)
 
     def _reset_disconnect_timer(self) -> None:
-        """Reset disconnect timer."""
-        if self._disconnect_timer:
-            self._disconnect_timer.cancel()
+        """Push the idle disconnect back by the disconnect delay."""
         self._expected_disconnect = False
-        if self._delay is not None and self._delay != 0:
-            self._disconnect_timer = self.loop.call_later(self._delay, self._disconnect)
+        if self._delay is not None and self._delay != 0 and not self._persistent and not self._sessions:
+            self._reaper.touch(self, self._delay)
+        else:
+            self._reaper.cancel(self)
 
     def _disconnected(self, client: BleakClientWithServiceCache) -> None:
         """Disconnected callback."""
+        self._connected_at = None
+        self._limiter.disconnected(self._mac)
         if self._expected_disconnect:
             LOGGER.debug("Disconnected from device")
             return
+        self._metrics["link_drops"] += 1
+        if self._link_task is not None:
+            LOGGER.debug("%s: Persistent link dropped, reconnecting in the background", self.name)
+            self._link_lost.set()
+            return
         LOGGER.warning("Device unexpectedly disconnected")
 
-    def _disconnect(self) -> None:
-        """Disconnect from device."""
-        self._disconnect_timer = None
-        asyncio.create_task(self._execute_timed_disconnect())
+    @property
+    def is_connected(self) -> bool:
+        return bool(self._client and self._client.is_connected)
+
+    @property
+    def link_uptime(self) -> float:
+        """Seconds the current connection has been up, 0 when disconnected."""
+        if self._connected_at is None or not (self._client and self._client.is_connected):
+            return 0.0
+        return time.monotonic() - self._connected_at
+
+    def start_persistent_link(self) -> None:
+        """Keep the device connected, reconnecting in the background whenever the link drops."""
+        if self._link_task is None:
+            self._link_lost = asyncio.Event()
+            self._link_task = self._hass.async_create_background_task(self._async_maintain_link(), f"lednetwf_ble link {self._mac}")
+
+    async def _async_maintain_link(self) -> None:
+        backoff = RECONNECT_BACKOFF_MIN
+        while True:
+            try:
+                reconnecting = self._metrics["connects"] > 0 and not (self._client and self._client.is_connected)
+                await self._ensure_connected()
+                if reconnecting:
+                    self._metrics["reconnects"] += 1
+                # The status query keeps the link busy enough that neither end drops it, and refreshes our state as a bonus
+                await self._write(bytearray(INITIAL_PACKET))
+                backoff = RECONNECT_BACKOFF_MIN
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.log(f"Persistent link: connection failed, retrying in {backoff}s: {error}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+                continue
+            self._link_lost.clear()
+            try:
+                await asyncio.wait_for(self._link_lost.wait(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
 
     async def stop(self) -> None:
         """Stop the LEDNET WF device."""
         LOGGER.debug("%s: Stop", self.name)
+        if self._link_task is not None:
+            self._link_task.cancel()
+            self._link_task = None
         await self._execute_disconnect()
+        if self._recorder is not None:
+            await self._recorder.async_flush()
 
     async def _execute_timed_disconnect(self) -> None:
         """Execute timed disconnection."""
         self.log(f"Disconnecting after timeout of {self._delay}")
-        await self._execute_disconnect()
+        await self._execute_disconnect(idle_only=True)
 
-    async def _execute_disconnect(self) -> None:
+    async def _execute_disconnect(self, idle_only: bool = False) -> None:
         """Execute disconnection."""
         async with self._connect_lock:
+            if idle_only and (self._sessions or self._persistent or self._reaper.is_scheduled(self)):
+                self.log("No longer idle, staying connected")
+                return
+            self._reaper.cancel(self)
             read_char = self._read_uuid
             client = self._client
             self._expected_disconnect = True
             self._client = None
             self._write_uuid = None
             self._read_uuid = None
+            self._limiter.disconnected(self._mac)
             if client and client.is_connected:
                 await client.stop_notify(read_char)
                 await client.disconnect()
             self.log("Disconnected")
     
-    def local_callback(self):
-        # Placeholder to be replaced by a call from light.py
-        # I can't work out how to plumb a callback from here to light.py
-        return
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Register an entity callback to be called when the device state changes.  Returns a function to unregister it."""
+        self._on_update_callbacks.append(update_callback)
+
+        def remove_listener() -> None:
+            if update_callback in self._on_update_callbacks:
+                self._on_update_callbacks.remove(update_callback)
+
+        return remove_listener
+
+    def schedule_update(self) -> None:
+        """Mark the state as changed.  Listeners are called once for however many changes happen before they run."""
+        if self._update_handle is not None:
+            return
+        if self._state_interval:
+            self._update_handle = self.loop.call_later(self._state_interval, self._update_listeners)
+        else:
+            self._update_handle = self.loop.call_soon(self._update_listeners)
+
+    def snapshot(self) -> StateSnapshot:
+        return StateSnapshot(self._is_on, self._brightness, self._color_mode, self._hs_color, self._rgb_color,
+                             self._color_temp_kelvin, self._effect, self._effect_speed, self._led_count, self._chip_type,
+                             self._color_order)
+
+    def record_command(self, latency: float | None = None) -> None:
+        """Add the state a command just delivered to the timeline.  Every path that writes state changes calls this once
+        the write is done, latency being how long it took."""
+        self._record_transition(SOURCE_COMMAND, latency)
+
+    def _record_transition(self, source: int, latency: float | None = None) -> None:
+        effect = self._driver.effect_index.get(self._effect)
+        self._timeline.record(source, self._is_on, self._color_mode, self._rgb_color, self._hs_color, self._color_temp_kelvin,
+                              self._brightness, effect, latency)
+
+    @property
+    def timeline(self) -> list[dict]:
+        """Recent state transitions, oldest first."""
+        return self._timeline.as_list(self._driver.effect_list)
+
+    def _update_listeners(self) -> None:
+        self._update_handle = None
+        snapshot = self.snapshot()
+        if snapshot == self._last_snapshot:
+            return # e.g. a status response confirming what we already had, nothing for HA to write
+        self._last_snapshot = snapshot
+        for update_callback in list(self._on_update_callbacks):
+            try:
+                update_callback()
+            except Exception:
+                LOGGER.exception("%s: Error in state listener", self.name)
 
     def normalize_brightness(self, new_brightness):
         "Make sure brightness is between 2 and 255 and then convert to percentage"
@@ -3,7 +3,7 @@ import voluptuous as vol
 from typing import Any, Optional, Tuple
 
 from .lednetwf import LEDNETWFInstance
-from .const import (DOMAIN, RING_LIGHT_MODEL, STRIP_LIGHT_MODEL)
+from .const import (DOMAIN)
 
 from homeassistant.const import CONF_MAC
 import homeassistant.helpers.config_validation as cv
@@ -13,6 +13,7 @@ from homeassistant.components.light import (
     ATTR_BRIGHTNESS,
     ATTR_COLOR_TEMP_KELVIN,
     ATTR_EFFECT,
+    ATTR_FLASH,
     EFFECT_OFF,
     ATTR_HS_COLOR,
     ATTR_RGB_COLOR,
@@ -47,16 +48,14 @@ class LEDNETWFLight(LightEntity):
         # 2025.3 ColorMode.BRIGHTNESS should not be specified with other combination of supported color modes, as it will throw an error, but is is supported
         # when lights are rendering an effect automatically
         # https://developers.home-assistant.io/docs/core/entity/light/#color-modes
-        if self._instance._model == RING_LIGHT_MODEL:
-            self._attr_supported_color_modes = {ColorMode.COLOR_TEMP, ColorMode.HS}
-            self._color_temp_kelvin: self._instance._color_temp_kelvin
-        else:
-            self._attr_supported_color_modes = {ColorMode.RGB}
-        self._attr_supported_features = LightEntityFeature.EFFECT
+        self._attr_supported_color_modes = self._instance.driver.color_modes # Shared by every light of the model
+        self._attr_supported_features = LightEntityFeature.EFFECT | LightEntityFeature.FLASH
         self._attr_name               = name
         self._attr_unique_id          = self._instance.mac
-        self._instance.local_callback = self.light_local_callback
-        
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._instance.async_add_listener(self.light_local_callback))
+
     @property
     def available(self):
         return self._instance.is_on != None
@@ -145,69 +144,47 @@ class LEDNETWFLight(LightEntity):
     
     @property
     def icon(self):
-        if self._instance._model == RING_LIGHT_MODEL:
-            return "mdi:lightbulb"
-        else:
-            return "mdi:led-strip-variant"
+        return self._instance.driver.icon
     
     async def async_turn_on(self, **kwargs: Any) -> None:
         # LOGGER.debug("async_turn_on called")
         # LOGGER.debug("kwargs: %s", kwargs)
 
-        if not self.is_on:
-            await self._instance.turn_on()
-
-        on_brightness = kwargs.get(ATTR_BRIGHTNESS)
-        if on_brightness is None and self._instance.brightness is not None:
-            on_brightness = self._instance.brightness
-        elif on_brightness is None and self._instance.brightness is None:
-            on_brightness = 255
-
-
-        if ATTR_COLOR_TEMP_KELVIN not in kwargs and ATTR_HS_COLOR not in kwargs and ATTR_EFFECT not in kwargs and ATTR_RGB_COLOR not in kwargs:
-            # i.e. only a brightness change
-            if self._instance._effect is not None and self._instance._effect is not EFFECT_OFF:
-                # Before HA 2024.2
-
-                # effect check go first because of the way HA handles brightness changes
-                # if there is no color mode set, the brightness slider in the UI gets disabled
-                # so we bodge it by keep the color mode set while adjusting the effect brightness.
-
-                #HA 2024.2 changes this, setting color mode to "brightness" should allow to change effects brightness as well as introduces the predefined EFFECT_OFF status
-                kwargs[ATTR_EFFECT] = self._instance.effect
-            elif self._instance._color_mode is ColorMode.COLOR_TEMP:
-                kwargs[ATTR_COLOR_TEMP_KELVIN] = self._instance.color_temp_kelvin
-            elif self._instance._color_mode is ColorMode.HS:
-                kwargs[ATTR_HS_COLOR] = self._instance.hs_color
-            elif self._instance._color_mode is ColorMode.RGB:
-                kwargs[ATTR_RGB_COLOR] = self._instance.rgb_color
-
-        if ATTR_BRIGHTNESS in kwargs and ATTR_EFFECT == EFFECT_OFF:
-            self._instance._effect = EFFECT_OFF
-        
-        if ATTR_COLOR_TEMP_KELVIN in kwargs:
-            self._instance._color_mode = ColorMode.COLOR_TEMP
-            # self._instance._effect = EFFECT_OFF
-            await self._instance.set_color_temp_kelvin(kwargs[ATTR_COLOR_TEMP_KELVIN], on_brightness)
-        elif ATTR_HS_COLOR in kwargs:
-            await self._instance.set_hs_color(kwargs[ATTR_HS_COLOR], on_brightness)
-        elif ATTR_RGB_COLOR in kwargs:
-            await self._instance.set_rgb_color(kwargs[ATTR_RGB_COLOR], on_brightness)
-        elif ATTR_EFFECT in kwargs and kwargs[ATTR_EFFECT] != EFFECT_OFF:
-            await self._instance.set_effect(kwargs[ATTR_EFFECT], on_brightness)
+        # The instance works out what actually needs sending.  e.g. a brightness only change resends the current
+        # colour or effect at the new brightness, and a call which doesn't change anything sends nothing at all.
+        tracer = self._instance._tracer
+        tracer.record_service_call(self._context, self._instance.mac)
+        with tracer.span("turn_on", self._instance.mac):
+            target = {"state": "on"}
+            for attr in (ATTR_BRIGHTNESS, ATTR_COLOR_TEMP_KELVIN, ATTR_HS_COLOR, ATTR_RGB_COLOR, ATTR_EFFECT):
+                if attr in kwargs:
+                    target[attr] = kwargs[attr]
+            await self._instance.apply_state(target)
+            if ATTR_FLASH in kwargs:
+                # Flash in the state just set, then stay in it
+                await self._instance.flash(kwargs[ATTR_FLASH])
         self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
-        # Fix for turn of circle effect of HSV MODE(controller skips turn off animation if state is not changed since last turn on)
-        if self._instance.brightness == 255:
-            temp_brightness = 254
-        else:
-            temp_brightness = self._instance.brightness + 1
-        if self._instance._color_mode is ColorMode.HS and ATTR_HS_COLOR not in kwargs:
-            await self._instance.set_hs_color(self._instance.hs_color, temp_brightness)
-
-        # Actual turn off
-        await self._instance.turn_off()
+        tracer = self._instance._tracer
+        tracer.record_service_call(self._context, self._instance.mac)
+        with tracer.span("turn_off", self._instance.mac):
+            if ATTR_FLASH in kwargs:
+                await self._instance.flash(kwargs[ATTR_FLASH])
+            target  = {"state": "off"}
+            packets = self._instance.plan_state(target)
+            if packets:
+                # Fix for turn of circle effect of HSV MODE(controller skips turn off animation if state is not changed since last turn on)
+                if self._instance._color_mode is ColorMode.HS and self._instance.hs_color is not None and ATTR_HS_COLOR not in kwargs:
+                    if self._instance.brightness == 255:
+                        temp_brightness = 254
+                    else:
+                        temp_brightness = self._instance.brightness + 1
+                    # Sent ahead of the turn off in the same batch, so a failure marks the state stale like any other
+                    packets.insert(0, self._instance._hs_packet(self._instance.hs_color, temp_brightness))
+
+                # Actual turn off
+                await self._instance.send_planned(target, packets)
         self.async_write_ha_state()
 
     async def async_update(self) -> None:
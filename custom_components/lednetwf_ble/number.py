@@ -30,7 +30,9 @@ class LEDNETWFSpeedSlider(NumberEntity):
         #self._attr_translation_key = attr_name # Can't get this to work
         self._attr_name            = attr_name
         self._attr_unique_id       = self._instance.mac
-        self._effect_speed         = self._instance._effect_speed
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._instance.async_add_listener(self.async_write_ha_state))
 
     @property
     def available(self):
@@ -47,7 +49,7 @@ class LEDNETWFSpeedSlider(NumberEntity):
 
     @property
     def native_value(self) -> int | None:
-        return self._effect_speed
+        return self._instance._effect_speed
 
     @property
     def device_info(self):
@@ -60,5 +62,5 @@ class LEDNETWFSpeedSlider(NumberEntity):
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
-        self._effect_speed = value
         await self._instance.set_effect_speed(int(value))
+        self.async_write_ha_state()
@@ -0,0 +1,103 @@
+import logging
+
+import numpy as np
+
+from .const import ATT_OVERHEAD, DEFAULT_MTU, STRIP_LIGHT_MODEL
+from .colors import BRIGHTNESS_LUT, chip_gamma_table
+
+LOGGER = logging.getLogger(__name__)
+
+# Per pixel colour data is sent with the 0x59 multi colour command, addressed by start pixel and pixel count:
+#   59 <start hi> <start lo> <count hi> <count lo> <r g b> * count <checksum>
+# The app sends the whole strip in one go.  Addressing a run of pixels lets us split the strip into segments that fit
+# in a single GATT write and only resend the segments that changed.
+SEGMENT_COMMAND     = 0x59
+SEGMENT_OVERHEAD    = 8 + 6 # Outer header, plus command, start, count and checksum
+MAX_INNER_LENGTH    = 255   # The inner length is a single byte in the outer header
+
+# Position of the R, G and B channels in the data each chip expects
+COLOR_ORDER_CHANNELS = {
+    "RGB": (0, 1, 2),
+    "RBG": (0, 2, 1),
+    "GRB": (1, 0, 2),
+    "GBR": (1, 2, 0),
+    "BRG": (2, 0, 1),
+    "BGR": (2, 1, 0),
+}
+
+
+class PixelStreamer:
+    """Stream per pixel frames to a 0x56 strip controller, resending only the segments which changed."""
+
+    def __init__(self, instance) -> None:
+        self._instance   = instance
+        self._last_frame: np.ndarray | None = None
+        self._last_counter = None
+        self.frames      = 0
+        self.packets     = 0
+
+    def reset(self) -> None:
+        """Forget the last frame, so the next one is sent in full."""
+        self._last_frame = None
+
+    @property
+    def segment_pixels(self) -> int:
+        client = self._instance._client
+        mtu    = getattr(client, "mtu_size", None) or DEFAULT_MTU
+        return max(1, min((mtu - ATT_OVERHEAD - SEGMENT_OVERHEAD) // 3, (MAX_INNER_LENGTH - 6) // 3))
+
+    def prepare(self, frame, brightness: int | None = None, gamma: bool = False) -> np.ndarray:
+        """Reorder channels for the chip and apply brightness (and optionally gamma), in one pass over the whole frame."""
+        led_count = self._instance._led_count
+        data = np.asarray(frame, dtype=np.uint8)
+        if data.shape != (led_count, 3):
+            raise ValueError(f"Frame must be shaped ({led_count}, 3), got {data.shape}")
+        color_order = getattr(self._instance._color_order, "name", self._instance._color_order) or "RGB"
+        table       = BRIGHTNESS_LUT[self._instance.normalize_brightness(brightness)]
+        if gamma and (gamma_table := chip_gamma_table(self._instance._chip_type)) is not None:
+            # Fold gamma into the brightness table so it's still a single lookup per channel
+            table = table[gamma_table]
+        return table[data[:, COLOR_ORDER_CHANNELS.get(color_order, (0, 1, 2))]]
+
+    def changed_segments(self, data: np.ndarray, segment_pixels: int) -> list[tuple[int, int]]:
+        """Return (start, count) for each segment which differs from the last frame."""
+        led_count = len(data)
+        if self._last_frame is None or self._last_frame.shape != data.shape or self._instance._packet_counter != self._last_counter:
+            # First frame, or something else has been sent to the device since, so we can't know what it is showing
+            changed = np.ones((led_count + segment_pixels - 1) // segment_pixels, dtype=bool)
+        else:
+            changed = np.logical_or.reduceat((data != self._last_frame).any(axis=1), np.arange(0, led_count, segment_pixels))
+        return [(int(segment) * segment_pixels, min(segment_pixels, led_count - int(segment) * segment_pixels)) for segment in np.flatnonzero(changed)]
+
+    def segment_packet(self, data: np.ndarray, start: int, count: int) -> bytearray:
+        inner_length = 6 + count * 3
+        packet = bytearray(8 + inner_length)
+        packet[2] = 0x80
+        packet[5] = inner_length
+        packet[6] = inner_length + 1
+        packet[7] = 0x0b
+        packet[8] = SEGMENT_COMMAND
+        packet[9:11]  = start.to_bytes(2, byteorder='big')
+        packet[11:13] = count.to_bytes(2, byteorder='big')
+        packet[13:13 + count * 3] = data[start:start + count].tobytes()
+        packet[-1] = sum(packet[8:-1]) & 0xFF
+        return packet
+
+    async def async_send_frame(self, frame, brightness: int | None = None, gamma: bool = False) -> int:
+        """Send a frame of (led_count, 3) RGB values.  Returns the number of packets it took."""
+        if self._instance._model != STRIP_LIGHT_MODEL:
+            LOGGER.error("Per pixel frames are only supported by 0x56 strip controllers")
+            return 0
+        data = self.prepare(frame, brightness, gamma)
+        # Connect first, segments are sized from the MTU the connection negotiated
+        async with self._instance.session():
+            segments = self.changed_segments(data, self.segment_pixels)
+            self._last_frame = data
+            self.frames += 1
+            if not segments:
+                return 0
+            packets = [self.segment_packet(data, start, count) for start, count in segments]
+            await self._instance.write_packets(packets)
+            self._last_counter = self._instance._packet_counter
+        self.packets += len(packets)
+        return len(packets)
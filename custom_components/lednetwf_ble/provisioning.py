@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+
+from homeassistant.config_entries import ConfigEntry
+
+from .const import CONF_COLORORDER, CONF_LEDCOUNT, CONF_LEDTYPE, ColorOrdering
+from .lednetwf import LEDNETWFInstance
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ProvisionResult:
+    def __init__(self) -> None:
+        self.duration      = 0.0
+        self.packets_built = 0
+        self.devices: dict[str, dict] = {}
+
+    def as_dict(self) -> dict:
+        return {"duration": self.duration, "packets_built": self.packets_built, "devices": self.devices}
+
+
+def _name(value) -> str | None:
+    # The instance holds chip type and colour order as option strings or, once read back from the device, as enum members
+    return getattr(value, "name", value)
+
+
+async def async_provision_led_settings(hass, targets: dict[ConfigEntry, LEDNETWFInstance], led_count: int | None = None,
+                                       chip_type: str | None = None, color_order: str | None = None,
+                                       force: bool = False) -> ProvisionResult:
+    """Change the LED count, chip type and colour order of many lights at once.
+
+    Anything not given is left as each light already has it.  The 0x62 packet is built once for each model and setting
+    and copied for every light that needs it.  Lights are provisioned concurrently, connecting through the adapter's
+    shared connection slots and disconnecting again straight after, and each one is checked by reading its settings
+    back.  Config entries of the lights that took the settings are updated in place, without a reload.
+    """
+    result   = ProvisionResult()
+    started  = time.monotonic()
+    packets  = {}
+    plans    = {}
+    for entry, instance in targets.items():
+        wanted = (led_count or instance._led_count, chip_type or _name(instance._chip_type), color_order or _name(instance._color_order))
+        device = result.devices[instance.mac] = {"entry_id": entry.entry_id, "led_count": wanted[0], "chip_type": wanted[1], "color_order": wanted[2]}
+        if None in wanted:
+            device["error"] = "Current settings unknown, give all three"
+            continue
+        chip = getattr(instance.driver.chip_types, wanted[1], None)
+        if chip is None:
+            device["error"] = f"Chip type {wanted[1]} not supported by model 0x{instance.driver.model:02X}"
+            continue
+        if not force and wanted == (instance._led_count, _name(instance._chip_type), _name(instance._color_order)):
+            device["status"] = "unchanged"
+            continue
+        key = (instance.driver.model, *wanted)
+        if key not in packets:
+            packets[key] = instance.driver.led_settings_packet(wanted[0], chip.value, getattr(ColorOrdering, wanted[2]).value)
+        plans[entry] = (instance, wanted, packets[key])
+    result.packets_built = len(packets)
+
+    async def _async_push(instance: LEDNETWFInstance, packet: bytearray) -> tuple | None:
+        # No slot taken here.  The connect inside takes one from the shared limiter under the device's connect lock, and
+        # taking them the other way round could deadlock with a command that already holds the lock.
+        was_connected = instance.is_connected
+        try:
+            return await instance.push_led_settings(bytearray(packet)) # A copy, the counter is stamped into it
+        finally:
+            if not was_connected and not instance._sessions and not instance._persistent:
+                # Hand the connection straight back rather than holding it until the idle reaper gets round to us
+                await instance._execute_disconnect()
+
+    pushes = await asyncio.gather(*(_async_push(instance, packet) for instance, _, packet in plans.values()), return_exceptions=True)
+    for (entry, (instance, wanted, _)), reported in zip(plans.items(), pushes):
+        device = result.devices[instance.mac]
+        if isinstance(reported, Exception):
+            LOGGER.warning("Provisioning: unable to reach %s: %s", instance.name, reported)
+            device["error"] = str(reported)
+            continue
+        if reported is None:
+            device["error"] = "No settings response"
+            continue
+        reported = (reported[0], _name(reported[1]), _name(reported[2]))
+        if reported != wanted:
+            device["error"] = f"Device reports {reported}"
+            continue
+        device["status"] = "provisioned"
+        options = {**entry.options, CONF_LEDCOUNT: wanted[0], CONF_LEDTYPE: wanted[1], CONF_COLORORDER: wanted[2]}
+        # The instance already runs with these, which tells the update listener there's nothing to send or reload
+        instance.reconfigure(entry.data, options)
+        hass.config_entries.async_update_entry(entry, options=options)
+
+    result.duration = time.monotonic() - started
+    LOGGER.debug("Pushed LED settings to %s of %s lights in %.3fs", len(plans), len(targets), result.duration)
+    return result
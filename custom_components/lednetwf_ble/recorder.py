@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+
+from .airtime import AirtimeLedger
+from .lednetwf import LEDNETWFInstance
+from .simulator import SimulatedBLEDevice, SimulatedDevice
+from .tracing import SpanTracer
+
+LOGGER = logging.getLogger(__name__)
+
+# Log layout: a file header followed by back to back records.
+#   header: magic, format version, model byte, MAC address (6 bytes)
+#   record: monotonic timestamp (double), direction, length, then <length> bytes of raw frame/notification
+LOG_MAGIC          = b"LNWF"
+LOG_VERSION        = 1
+LOG_HEADER         = struct.Struct("<4sBB6s")
+RECORD_HEADER      = struct.Struct("<dBH")
+DIRECTION_TX       = 0x01
+DIRECTION_RX       = 0x02
+DEFAULT_MAX_BYTES  = 512 * 1024 # Per file.  One rotated file is kept, so the log never grows beyond twice this.
+FLUSH_THRESHOLD    = 4096
+
+
+class TrafficRecorder:
+    """Capture frames sent to and notifications received from one device into a bounded binary log."""
+
+    def __init__(self, hass, mac: str, model: int, path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self._hass        = hass
+        self._path        = path
+        self._max_bytes   = max_bytes
+        self._header      = LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, model, bytes.fromhex(mac.replace(":", "")))
+        self._buffer      = bytearray()
+        self._file_size   = None
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def record_sent(self, data: bytes) -> None:
+        self._record(DIRECTION_TX, data)
+
+    def record_received(self, data: bytes) -> None:
+        self._record(DIRECTION_RX, data)
+
+    def _record(self, direction: int, data: bytes) -> None:
+        # Called from the write and notification paths, so this only appends to memory.  Disk I/O happens in the executor.
+        self._buffer += RECORD_HEADER.pack(time.monotonic(), direction, len(data))
+        self._buffer += data
+        if len(self._buffer) >= FLUSH_THRESHOLD:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._hass.async_create_task(self._async_flush())
+
+    async def _async_flush(self) -> None:
+        # A single flush task drains the buffer so chunks always land on disk in order
+        while self._buffer:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+            await self._hass.async_add_executor_job(self._write_chunk, chunk)
+
+    async def async_flush(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._async_flush()
+
+    def _write_chunk(self, chunk: bytes) -> None:
+        if self._file_size is None:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            self._file_size = os.path.getsize(self._path) if os.path.exists(self._path) else 0
+        if self._file_size == 0 or self._file_size + len(chunk) > self._max_bytes:
+            if self._file_size:
+                os.replace(self._path, f"{self._path}.1")
+            with open(self._path, "wb") as log_file:
+                log_file.write(self._header)
+            self._file_size = len(self._header)
+        with open(self._path, "ab") as log_file:
+            log_file.write(chunk)
+        self._file_size += len(chunk)
+
+
+def read_traffic_log(path: str) -> tuple[int, str, list[tuple[float, int, bytes]]]:
+    """Read a log written by TrafficRecorder.  Returns (model, mac, [(timestamp, direction, data), ...])."""
+    with open(path, "rb") as log_file:
+        raw = log_file.read()
+    magic, version, model, mac = LOG_HEADER.unpack_from(raw, 0)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{path} is not a LEDnetWF traffic log")
+    records = []
+    offset  = LOG_HEADER.size
+    while offset + RECORD_HEADER.size <= len(raw):
+        timestamp, direction, length = RECORD_HEADER.unpack_from(raw, offset)
+        offset += RECORD_HEADER.size
+        if offset + length > len(raw):
+            break # Truncated final record, e.g. HA was killed mid write
+        records.append((timestamp, direction, raw[offset:offset + length]))
+        offset += length
+    return model, ":".join(f"{byte:02X}" for byte in mac), records
+
+
+class ReplayResult:
+    def __init__(self) -> None:
+        self.frames         = 0
+        self.notifications  = 0
+        self.decode_seconds = 0.0
+        self.max_decode     = 0.0
+        self.duration       = 0.0
+        self.mismatches: list[str] = []
+
+    def as_dict(self) -> dict:
+        return {
+            "frames":             self.frames,
+            "notifications":      self.notifications,
+            "decode_seconds":     self.decode_seconds,
+            "max_decode_seconds": self.max_decode,
+            "duration":           self.duration,
+            "mismatches":         self.mismatches,
+        }
+
+
+async def async_replay(instance, records, speed: float = 1.0) -> ReplayResult:
+    """Feed a recorded session back through the instance decoder and a simulated device.
+
+    speed 1.0 keeps the original timing, 10.0 replays ten times faster and 0 replays as fast as possible.
+    """
+    result  = ReplayResult()
+    device  = SimulatedDevice(model=instance._model, led_count=instance._led_count or 0)
+    device.is_on = None # Unknown until the recording contains a power command
+    started = time.monotonic()
+    first   = records[0][0] if records else 0.0
+    for timestamp, direction, data in records:
+        if speed > 0:
+            delay = (timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if direction == DIRECTION_TX:
+            result.frames += 1
+            device.handle_write(bytearray(data))
+        elif direction == DIRECTION_RX:
+            result.notifications += 1
+            decode_start = time.perf_counter()
+            instance._notification_handler(None, bytearray(data))
+            elapsed = time.perf_counter() - decode_start
+            result.decode_seconds += elapsed
+            result.max_decode = max(result.max_decode, elapsed)
+    result.duration = time.monotonic() - started
+
+    # The decoded state should agree with what the recorded commands did to the simulated device
+    if result.notifications and device.is_on is not None and instance.is_on != device.is_on:
+        result.mismatches.append(f"is_on: decoded {instance.is_on}, simulated {device.is_on}")
+    return result
+
+
+async def async_replay_log(hass, path: str, speed: float = 1.0) -> ReplayResult:
+    """Replay a log file against an offline instance, no radio involved."""
+    model, mac, records = await hass.async_add_executor_job(read_traffic_log, path)
+    device   = SimulatedDevice(model=model)
+    instance = LEDNETWFInstance(mac, hass, ble_device=SimulatedBLEDevice(mac), manufacturer_data=device.manufacturer_data())
+    # Replayed traffic never went over the air now, keep it out of the shared ledger and any capture that's running
+    instance._airtime = AirtimeLedger()
+    instance._tracer  = SpanTracer()
+    return await async_replay(instance, records, speed)
@@ -0,0 +1,68 @@
+import logging
+
+from .lednetwf import LEDNETWFInstance
+
+LOGGER = logging.getLogger(__name__)
+
+DATA_REGISTRY   = "lednetwf_ble_instances"
+HANDOFF_TIMEOUT = 120.0 # Seconds a released instance is kept, connection and all, for whoever sets the device up next
+
+
+class InstanceRegistry:
+    """One LEDNETWFInstance per MAC address, handed on from the config flow to the config entry and across reloads.
+
+    Taking over an existing instance keeps its live connection, cached GATT services and decoded state, so finishing
+    onboarding or changing the options doesn't mean connecting to the device from scratch.
+    """
+
+    def __init__(self, hass) -> None:
+        self._hass      = hass
+        self._instances: dict[str, LEDNETWFInstance] = {}
+        self._expiry    = {}
+
+    def acquire(self, mac: str, data: dict | None = None, options: dict | None = None) -> LEDNETWFInstance:
+        """Take the instance for a device, creating it if nobody has one.  data and options are applied to a reused instance."""
+        mac = mac.upper()
+        handle = self._expiry.pop(mac, None)
+        if handle is not None:
+            handle.cancel()
+        instance = self._instances.get(mac)
+        if instance is None:
+            instance = LEDNETWFInstance(mac, self._hass, data or {}, options or {})
+            self._instances[mac] = instance
+            return instance
+        LOGGER.debug("%s: Taking over the existing instance", mac)
+        instance.metrics["handoffs"] += 1
+        if data is not None:
+            instance.reconfigure(data, options or {})
+        return instance
+
+    async def async_release(self, instance: LEDNETWFInstance) -> None:
+        """Give an instance back.  It stays as it is for HANDOFF_TIMEOUT in case something takes it over, then it is stopped."""
+        mac = instance._mac.upper()
+        if self._instances.get(mac) is not instance:
+            await instance.stop()
+            return
+        if instance._recorder is not None:
+            await instance._recorder.async_flush()
+            instance._recorder = None
+        old = self._expiry.pop(mac, None)
+        if old is not None:
+            old.cancel()
+        self._expiry[mac] = self._hass.loop.call_later(
+            HANDOFF_TIMEOUT, lambda: self._hass.async_create_task(self._async_expire(mac))
+        )
+
+    async def _async_expire(self, mac: str) -> None:
+        self._expiry.pop(mac, None)
+        instance = self._instances.pop(mac, None)
+        if instance is not None:
+            LOGGER.debug("%s: Nobody took over the instance, stopping it", mac)
+            instance._airtime.forget(instance._mac)
+            await instance.stop()
+
+
+def get_registry(hass) -> InstanceRegistry:
+    if DATA_REGISTRY not in hass.data:
+        hass.data[DATA_REGISTRY] = InstanceRegistry(hass)
+    return hass.data[DATA_REGISTRY]
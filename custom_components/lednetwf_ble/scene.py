@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+
+from .lednetwf import INITIAL_PACKET, LEDNETWFInstance
+
+LOGGER = logging.getLogger(__name__)
+
+SYNC_PROBES = 3    # Timed status queries per device, to estimate how long a write takes to land
+SYNC_MARGIN = 0.02 # Seconds of slack between measuring the latencies and the moment the effects start
+
+
+class SceneResult:
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self.spread: float | None = None
+        self.devices: dict[str, dict] = {}
+
+    def as_dict(self) -> dict:
+        result = {"duration": self.duration, "devices": self.devices}
+        if self.spread is not None:
+            result["spread"] = self.spread
+        return result
+
+
+async def async_apply_scene(targets: dict[LEDNETWFInstance, dict], force: bool = False) -> SceneResult:
+    """Bring many lights to a target state in one go.
+
+    Each device only gets the packets needed to get from its known state to the target.  All devices that need
+    anything are connected concurrently (the adapter limit is enforced by _ensure_connected) and held in a session,
+    then every packet is sent in a single burst.
+    """
+    result  = SceneResult()
+    started = time.monotonic()
+    plans   = {instance: instance.plan_state(target, force) for instance, target in targets.items()}
+    for instance, packets in plans.items():
+        result.devices[instance.mac] = {"packets": len(packets)}
+
+    pending  = [instance for instance, packets in plans.items() if packets]
+    async with AsyncExitStack() as sessions:
+        connects = await asyncio.gather(*(sessions.enter_async_context(instance.session()) for instance in pending), return_exceptions=True)
+        ready    = []
+        for instance, error in zip(pending, connects):
+            if isinstance(error, Exception):
+                LOGGER.warning("Scene: unable to connect to %s: %s", instance.name, error)
+                result.devices[instance.mac]["error"] = str(error)
+                instance.journal_state(targets[instance])
+            else:
+                ready.append(instance)
+
+        burst  = time.monotonic()
+        writes = await asyncio.gather(*(instance.write_packets(plans[instance]) for instance in ready), return_exceptions=True)
+        for instance, error in zip(ready, writes):
+            if isinstance(error, Exception):
+                LOGGER.warning("Scene: unable to write to %s: %s", instance.name, error)
+                result.devices[instance.mac]["error"] = str(error)
+                instance.journal_state(targets[instance])
+            else:
+                instance.record_command(time.monotonic() - burst)
+            instance.schedule_update()
+
+    result.duration = time.monotonic() - started
+    LOGGER.debug("Scene applied to %s lights in %.3fs", len(targets), result.duration)
+    return result
+
+
+async def _async_measure_latency(instance: LEDNETWFInstance) -> float:
+    samples = []
+    for _ in range(SYNC_PROBES):
+        start = time.monotonic()
+        await instance._write(bytearray(INITIAL_PACKET))
+        samples.append(time.monotonic() - start)
+    return sorted(samples)[len(samples) // 2]
+
+
+async def async_start_effect_synchronised(instances: list[LEDNETWFInstance], effect: str, brightness: int | None = None) -> SceneResult:
+    """Start the same effect on many lights at the same moment, so their animations run in phase.
+
+    Every light is connected and held in a session first, and the time a write takes to complete is measured on each.
+    The effect packets are then released so that, allowing for each light's latency, they all complete together.  The
+    spread between the first and last completion is reported.
+    """
+    result  = SceneResult()
+    started = time.monotonic()
+    for instance in instances:
+        result.devices[instance.mac] = {}
+
+    async with AsyncExitStack() as sessions:
+        connects = await asyncio.gather(*(sessions.enter_async_context(instance.session()) for instance in instances), return_exceptions=True)
+        ready    = [instance for instance, error in zip(instances, connects) if not isinstance(error, Exception)]
+        for instance, error in zip(instances, connects):
+            if isinstance(error, Exception):
+                LOGGER.warning("Synchronised effect: unable to connect to %s: %s", instance.name, error)
+                result.devices[instance.mac]["error"] = str(error)
+
+        measured  = await asyncio.gather(*(_async_measure_latency(instance) for instance in ready), return_exceptions=True)
+        latencies = {}
+        for instance, latency in zip(ready, measured):
+            if isinstance(latency, Exception):
+                result.devices[instance.mac]["error"] = str(latency)
+                continue
+            packet = instance._effect_packet(effect, brightness)
+            if packet is None:
+                result.devices[instance.mac]["error"] = f"Effect {effect} not supported"
+                continue
+            instance._stamp(packet) # So nothing is left to do at release time but the write itself
+            latencies[instance] = (latency, packet)
+            result.devices[instance.mac]["latency"] = latency
+        if not latencies:
+            result.duration = time.monotonic() - started
+            return result
+
+        release = time.monotonic() + max(latency for latency, _ in latencies.values()) + SYNC_MARGIN
+
+        async def _async_release(instance: LEDNETWFInstance, latency: float, packet: bytearray) -> float:
+            await asyncio.sleep(release - latency - time.monotonic())
+            await instance._write_while_connected(packet)
+            return time.monotonic()
+
+        finished = await asyncio.gather(*(_async_release(instance, *entry) for instance, entry in latencies.items()), return_exceptions=True)
+        landed   = []
+        for instance, completed in zip(latencies, finished):
+            if isinstance(completed, Exception):
+                result.devices[instance.mac]["error"] = str(completed)
+            else:
+                landed.append(completed)
+                result.devices[instance.mac]["offset"] = completed - release
+                instance.record_command(completed - release + latencies[instance][0])
+            instance.schedule_update()
+
+    result.spread   = max(landed) - min(landed) if landed else None
+    result.duration = time.monotonic() - started
+    LOGGER.debug("Effect %s started on %s lights with a spread of %s", effect, len(landed), result.spread)
+    return result
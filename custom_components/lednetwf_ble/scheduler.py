@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from collections.abc import Callable
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+LOGGER = logging.getLogger(__name__)
+
+DATA_LIMITER                = "lednetwf_ble_connection_limiter"
+ADAPTER_CONNECTION_LIMIT    = 3 # ESPHome proxies default to 3 connection slots, local adapters usually manage a few more
+RESERVED_CONNECTION_SLOTS   = 1 # Of those, kept aside for devices on a persistent link so their reconnects never queue behind other traffic
+DEFAULT_ADAPTER             = "default"
+DATA_REFRESH_SCHEDULER      = "lednetwf_ble_refresh_scheduler"
+REFRESH_INTERVAL            = 300.0 # Seconds a device's state can go unconfirmed before the scheduler asks for it
+REFRESH_JITTER              = 0.25  # Fraction of each delay that is randomised, so devices added together drift apart
+REFRESH_SPACING             = 2.0   # Minimum seconds between two queries from the scheduler
+REFRESH_RETRY               = 30.0  # Seconds to wait when the adapter has no spare connection slot
+DATA_REAPER                 = "lednetwf_ble_idle_reaper"
+REAPER_BATCH                = 4     # Idle devices disconnected at the same time
+SHUTDOWN_TIMEOUT            = 10.0  # Seconds allowed for disconnecting every device when Home Assistant stops
+
+
+class ConnectionLimiter:
+    """Caps the number of connection attempts in flight per Bluetooth adapter or proxy.
+
+    The reserved slots come out of the limit, so ordinary traffic gets limit - reserved of them.  Devices on a persistent
+    link can take a slot from either pool, whichever comes free first.  Connections that are up are counted too, as a
+    proxy's connection slots stay taken for as long as the link is, so background work can tell whether it would be
+    taking one somebody else needs.
+    """
+
+    def __init__(self, limit: int = ADAPTER_CONNECTION_LIMIT, reserved: int = RESERVED_CONNECTION_SLOTS) -> None:
+        self._limit      = limit
+        self._reserved   = min(reserved, limit - 1) # Always leave ordinary traffic at least one
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._reserved_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._connections: dict[str, set[str]] = {} # adapter: MACs of the devices connected through it
+
+    def _pool(self, adapter: str | None, reserved: bool) -> asyncio.Semaphore:
+        adapter = adapter or DEFAULT_ADAPTER
+        pool, size = (self._reserved_semaphores, self._reserved) if reserved else (self._semaphores, self._limit - self._reserved)
+        if adapter not in pool:
+            pool[adapter] = asyncio.Semaphore(size)
+        return pool[adapter]
+
+    def slot(self, adapter: str | None, reserved: bool = False):
+        """Async context manager holding one connection slot on the adapter."""
+        if reserved and self._reserved:
+            return self._either(self._pool(adapter, True), self._pool(adapter, False))
+        return self._pool(adapter, False)
+
+    @asynccontextmanager
+    async def _either(self, first: asyncio.Semaphore, second: asyncio.Semaphore):
+        for semaphore in (first, second):
+            if not semaphore.locked():
+                await semaphore.acquire() # Free, so this doesn't wait
+                break
+        else:
+            waiters = {asyncio.ensure_future(first.acquire()): first, asyncio.ensure_future(second.acquire()): second}
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                semaphore = None
+                for waiter, pool in waiters.items():
+                    if waiter.done() and not waiter.cancelled() and semaphore is None and not asyncio.current_task().cancelling():
+                        semaphore = pool
+                    elif waiter.done() and not waiter.cancelled():
+                        pool.release() # Both came free at once, or we were cancelled.  Only keep one.
+                    else:
+                        waiter.cancel()
+            if semaphore is None:
+                raise asyncio.CancelledError
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def connected(self, adapter: str | None, mac: str) -> None:
+        self._connections.setdefault(adapter or DEFAULT_ADAPTER, set()).add(mac)
+
+    def disconnected(self, mac: str) -> None:
+        for connections in self._connections.values():
+            connections.discard(mac)
+
+    def has_spare(self, adapter: str | None) -> bool:
+        """True if a connection on the adapter could start right now without queueing, and the connections already up
+        leave one of its ordinary slots free for it."""
+        adapter = adapter or DEFAULT_ADAPTER
+        return not self._pool(adapter, False).locked() and len(self._connections.get(adapter, ())) < self._limit - self._reserved
+
+
+def _jittered(delay: float) -> float:
+    return delay * random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER)
+
+
+class RefreshScheduler:
+    """Asks devices nobody has heard from in a while for their state, one at a time and spread out over time.
+
+    Devices that have answered a command or advertised the state we expect are left alone, as are devices whose adapter
+    is busy.  Connected devices are always refreshed as the query doesn't need a connection slot.
+    """
+
+    def __init__(self, hass) -> None:
+        self._hass    = hass
+        self._limiter = get_limiter(hass)
+        self._due: dict = {} # instance: monotonic time it should next be checked
+        self._wake    = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def async_add(self, instance) -> Callable[[], None]:
+        """Start refreshing a device.  Returns a function to stop."""
+        # A random first check spreads devices set up together (i.e. at startup) across the whole interval
+        self._due[instance] = time.monotonic() + random.uniform(0, REFRESH_INTERVAL)
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(self._async_run(), "lednetwf_ble refresh scheduler")
+
+        def remove() -> None:
+            self._due.pop(instance, None)
+            if not self._due and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+        return remove
+
+    async def _async_run(self) -> None:
+        while self._due:
+            instance, due = min(self._due.items(), key=lambda item: item[1])
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            age = instance.state_age
+            if age < REFRESH_INTERVAL:
+                # Heard from recently enough, look again when it could have gone stale
+                self._due[instance] = time.monotonic() + _jittered(REFRESH_INTERVAL - age)
+                continue
+            if not instance.is_connected and not self._limiter.has_spare(instance.adapter):
+                self._due[instance] = time.monotonic() + _jittered(REFRESH_RETRY)
+                continue
+            self._due[instance] = time.monotonic() + _jittered(REFRESH_INTERVAL)
+            LOGGER.debug("%s: State is %.0fs old, refreshing", instance.name, age)
+            try:
+                await instance.async_refresh_state()
+            except Exception:
+                LOGGER.exception("%s: Error refreshing state", instance.name)
+            await asyncio.sleep(_jittered(REFRESH_SPACING))
+
+
+class IdleReaper:
+    """Disconnects devices once they have been idle for their disconnect delay.
+
+    Every device's deadline lives in one heap, so keeping a connection alive is just updating a number rather than
+    cancelling and re-creating a timer per packet.  Disconnects happen in batches of REAPER_BATCH from a single task,
+    so nothing is left running unowned, and everything is disconnected together when Home Assistant stops.
+    """
+
+    def __init__(self, hass) -> None:
+        self._hass      = hass
+        self._deadlines: dict = {} # instance: current deadline.  The heap may hold older, earlier entries.
+        self._heap: list = []
+        self._sequence  = itertools.count() # Tie breaker, instances don't compare
+        self._instances = weakref.WeakSet()
+        self._wake      = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_shutdown)
+
+    def register(self, instance) -> None:
+        """Include a device in the disconnect at shutdown."""
+        self._instances.add(instance)
+
+    def touch(self, instance, delay: float) -> None:
+        """Disconnect the device delay seconds from now, unless touched again before then."""
+        deadline = time.monotonic() + delay
+        previous = self._deadlines.get(instance)
+        self._deadlines[instance] = deadline
+        if previous is not None and previous <= deadline:
+            return # Already in the heap, it gets moved on when its old deadline comes round
+        heapq.heappush(self._heap, (deadline, next(self._sequence), instance))
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(self._async_run(), "lednetwf_ble idle reaper")
+
+    def cancel(self, instance) -> None:
+        self._deadlines.pop(instance, None)
+
+    def is_scheduled(self, instance) -> bool:
+        return instance in self._deadlines
+
+    async def _async_run(self) -> None:
+        while self._heap:
+            deadline, _, instance = self._heap[0]
+            current = self._deadlines.get(instance)
+            if current is None or current < deadline:
+                heapq.heappop(self._heap) # Cancelled, or superseded by an earlier entry
+                continue
+            if current > deadline:
+                heapq.heapreplace(self._heap, (current, next(self._sequence), instance))
+                continue
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            due = []
+            while self._heap and len(due) < REAPER_BATCH:
+                deadline, _, instance = self._heap[0]
+                if self._deadlines.get(instance) != deadline or deadline > time.monotonic():
+                    break
+                heapq.heappop(self._heap)
+                del self._deadlines[instance]
+                due.append(instance)
+            results = await asyncio.gather(*(instance._execute_timed_disconnect() for instance in due), return_exceptions=True)
+            for instance, result in zip(due, results):
+                if isinstance(result, Exception):
+                    LOGGER.debug("%s: Error disconnecting idle device: %s", instance.name, result)
+
+    async def _async_shutdown(self, _event=None) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
+        self._deadlines.clear()
+        instances = list(self._instances)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(instance.stop() for instance in instances), return_exceptions=True), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            LOGGER.warning("Timed out disconnecting %s devices on shutdown", len(instances))
+
+
+def get_reaper(hass) -> IdleReaper:
+    if DATA_REAPER not in hass.data:
+        hass.data[DATA_REAPER] = IdleReaper(hass)
+    return hass.data[DATA_REAPER]
+
+
+def get_refresh_scheduler(hass) -> RefreshScheduler:
+    if DATA_REFRESH_SCHEDULER not in hass.data:
+        hass.data[DATA_REFRESH_SCHEDULER] = RefreshScheduler(hass)
+    return hass.data[DATA_REFRESH_SCHEDULER]
+
+
+def get_limiter(hass) -> ConnectionLimiter:
+    """Return the limiter shared by every device of the integration."""
+    if DATA_LIMITER not in hass.data:
+        hass.data[DATA_LIMITER] = ConnectionLimiter()
+    return hass.data[DATA_LIMITER]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+from datetime import timedelta
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from .lednetwf import LEDNETWFInstance
+from .airtime import AIRTIME_WINDOW, utilisation
+from .const import DOMAIN
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers import device_registry
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+
+SCAN_INTERVAL = timedelta(seconds=30) # The totals roll over a 60 second window, no point polling them more often
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    instance = hass.data[DOMAIN][config_entry.entry_id]
+    async_add_entities([LEDNETWFAirtimeSensor(instance), LEDNETWFTrafficSensor(instance)])
+
+class LEDNETWFRadioSensor(SensorEntity):
+    """Base for the radio accounting sensors.  Values come from the shared airtime ledger and are polled."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class     = SensorStateClass.MEASUREMENT
+    _key                  = ""
+
+    def __init__(self, lednetfInstance: LEDNETWFInstance) -> None:
+        self._instance        = lednetfInstance
+        self._attr_unique_id  = f"{self._instance.mac}_{self._key}"
+
+    @property
+    def _totals(self) -> dict:
+        return self._instance._airtime.device(self._instance._mac)
+
+    @property
+    def device_info(self):
+        """Return device info."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._instance.mac)},
+            connections={(device_registry.CONNECTION_NETWORK_MAC,
+                          self._instance.mac)},
+        )
+
+class LEDNETWFAirtimeSensor(LEDNETWFRadioSensor):
+    """Estimated radio time used by the device over the last minute, broken down by command."""
+
+    _attr_name                       = "Airtime"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 1
+    _key                             = "airtime"
+
+    @property
+    def native_value(self) -> float:
+        return self._totals["airtime_us"] / 1000
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        totals  = self._totals
+        adapter = self._instance._airtime.adapter(self._instance.adapter)
+        return {
+            "window":              AIRTIME_WINDOW,
+            "utilisation":         utilisation(totals["airtime_us"]),
+            "adapter":             self._instance.adapter,
+            "adapter_airtime":     adapter["airtime_us"] / 1000,
+            "adapter_utilisation": utilisation(adapter["airtime_us"]),
+            "connects":            totals["connects"],
+            "connect_failures":    totals["connect_failures"],
+            "retries":             totals["retries"],
+            "commands":            {name: command["airtime_us"] / 1000 for name, command in totals["commands"].items()},
+        }
+
+class LEDNETWFTrafficSensor(LEDNETWFRadioSensor):
+    """Bytes sent to and received from the device over the last minute."""
+
+    _attr_name                       = "Radio traffic"
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _key                             = "radio_traffic"
+
+    @property
+    def native_value(self) -> int:
+        totals = self._totals
+        return totals["bytes_sent"] + totals["bytes_received"]
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        totals = self._totals
+        return {
+            "window":         AIRTIME_WINDOW,
+            "frames_sent":    totals["frames_sent"],
+            "bytes_sent":     totals["bytes_sent"],
+            "notifications":  totals["notifications"],
+            "bytes_received": totals["bytes_received"],
+            "commands":       {name: command["frames_sent"] for name, command in totals["commands"].items()},
+        }
@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import AsyncExitStack
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+from .lednetwf import LEDNETWFInstance
+
+LOGGER = logging.getLogger(__name__)
+
+DATA_SEQUENCER    = "lednetwf_ble_sequencer"
+MIN_STEP_DURATION = 0.5 # Seconds.  Anything quicker is better done with an effect on the device itself.
+STEP_KEYS         = ("effect", "rgb_color", "hs_color", "color_temp_kelvin", "brightness", "effect_speed")
+
+
+class Playlist:
+    """A list of steps shown in turn on one or more lights, which all change together."""
+
+    def __init__(self, name: str, instances: list[LEDNETWFInstance], steps: list[dict], repeat: bool = True) -> None:
+        self.name      = name
+        self.instances = instances
+        self.repeat    = repeat
+        # Each step is kept as the target plan_state takes, plus how long it's shown for
+        self.steps     = [({"state": "on", **{key: step[key] for key in STEP_KEYS if key in step}},
+                           max(MIN_STEP_DURATION, step["duration"])) for step in steps]
+        self.index     = -1
+        self.deadline  = 0.0 # When the next step is due
+        self.started   = 0.0
+        self.steps_shown   = 0
+        self.steps_skipped = 0 # Steps whose time had passed before the sequencer got round to them
+        self.max_lateness  = 0.0
+        self.errors: dict[str, str] = {}
+        self.sessions  = AsyncExitStack()
+        self.step_task: asyncio.Task | None = None
+
+    @property
+    def finished(self) -> bool:
+        return not self.repeat and self.index >= len(self.steps) - 1
+
+    def advance(self, now: float) -> tuple[dict, float]:
+        """Move to the step that should be showing at now.  Returns its target and how late it is."""
+        self.index += 1
+        if self.index >= len(self.steps):
+            self.index = 0
+        # If we've fallen behind, jump to where the playlist should be rather than rushing through the missed steps
+        while not self.finished and self.deadline + self.steps[self.index][1] <= now:
+            self.deadline += self.steps[self.index][1]
+            self.index = (self.index + 1) % len(self.steps)
+            self.steps_skipped += 1
+        target, duration = self.steps[self.index]
+        lateness       = now - self.deadline
+        self.deadline += duration # From the schedule, never from now, so the timing doesn't drift
+        self.steps_shown  += 1
+        self.max_lateness  = max(self.max_lateness, lateness)
+        return target, lateness
+
+    def as_dict(self) -> dict:
+        return {
+            "name":          self.name,
+            "devices":       [instance.mac for instance in self.instances],
+            "step":          self.index,
+            "steps":         len(self.steps),
+            "repeat":        self.repeat,
+            "running_for":   time.monotonic() - self.started,
+            "steps_shown":   self.steps_shown,
+            "steps_skipped": self.steps_skipped,
+            "max_lateness":  self.max_lateness,
+            "errors":        self.errors,
+        }
+
+
+class EffectSequencer:
+    """Runs every playlist from one task, against absolute deadlines.
+
+    The next deadline of every playlist lives in one heap, like the idle reaper's, and each step is scheduled from the
+    previous step's deadline rather than from when it was sent, so playlists don't drift however long they run.  While
+    a playlist is active its lights are held in a session, so steps never wait for a connection.
+    """
+
+    def __init__(self, hass) -> None:
+        self._hass      = hass
+        self._playlists: dict[str, Playlist] = {}
+        self._heap: list = []
+        self._sequence  = itertools.count() # Tie breaker, playlists don't compare
+        self._wake      = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_shutdown)
+
+    @property
+    def playlists(self) -> dict[str, Playlist]:
+        return self._playlists
+
+    async def async_start(self, name: str, instances: list[LEDNETWFInstance], steps: list[dict], repeat: bool = True) -> Playlist:
+        """Start a playlist, replacing one of the same name and any other playlist running on the same lights."""
+        await self.async_stop(name)
+        for other in [other for other in self._playlists.values() if set(other.instances) & set(instances)]:
+            await self.async_stop(other.name)
+        playlist = Playlist(name, instances, steps, repeat)
+        connects = await asyncio.gather(*(playlist.sessions.enter_async_context(instance.session()) for instance in instances), return_exceptions=True)
+        for instance, error in zip(instances, connects):
+            if isinstance(error, Exception):
+                # Carry on without it.  plan_state will journal its steps if it comes back while we're running.
+                LOGGER.warning("Playlist %s: unable to connect to %s: %s", name, instance.name, error)
+                playlist.errors[instance.mac] = str(error)
+        playlist.started  = time.monotonic()
+        playlist.deadline = playlist.started
+        self._playlists[name] = playlist
+        heapq.heappush(self._heap, (playlist.deadline, next(self._sequence), playlist))
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(self._async_run(), "lednetwf_ble effect sequencer")
+        return playlist
+
+    async def async_stop(self, name: str) -> Playlist | None:
+        """Stop a playlist, leaving its lights on whatever step they were showing."""
+        playlist = self._playlists.pop(name, None)
+        if playlist is not None:
+            await self._async_finish(playlist) # Stale heap entries are dropped when they come round
+        return playlist
+
+    async def _async_run(self) -> None:
+        while self._heap:
+            deadline, _, playlist = self._heap[0]
+            if self._playlists.get(playlist.name) is not playlist or playlist.deadline != deadline:
+                heapq.heappop(self._heap)
+                continue
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            while self._heap and self._heap[0][0] <= time.monotonic():
+                deadline, _, playlist = heapq.heappop(self._heap)
+                if self._playlists.get(playlist.name) is not playlist or playlist.deadline != deadline:
+                    continue
+                target, lateness = playlist.advance(time.monotonic())
+                LOGGER.debug("Playlist %s: step %s, %.3fs late", playlist.name, playlist.index, lateness)
+                # Sent from a task of its own, so a slow light can't hold up the schedule of any other playlist
+                playlist.step_task = self._hass.async_create_task(self._async_step(playlist, target))
+                if playlist.finished:
+                    self._playlists.pop(playlist.name)
+                    self._hass.async_create_task(self._async_finish(playlist))
+                else:
+                    heapq.heappush(self._heap, (playlist.deadline, next(self._sequence), playlist))
+
+    async def _async_step(self, playlist: Playlist, target: dict) -> None:
+        plans   = [(instance, instance.plan_state(target)) for instance in playlist.instances]
+        results = await asyncio.gather(*(instance.send_planned(target, packets) for instance, packets in plans), return_exceptions=True)
+        for (instance, _), result in zip(plans, results):
+            if isinstance(result, Exception):
+                LOGGER.debug("Playlist %s: step %s failed on %s: %s", playlist.name, playlist.index, instance.name, result)
+                playlist.errors[instance.mac] = str(result)
+
+    async def _async_finish(self, playlist: Playlist) -> None:
+        if playlist.step_task is not None:
+            await playlist.step_task # Let the last step go out before the connections are released
+        await playlist.sessions.aclose()
+
+    async def _async_shutdown(self, _event=None) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for name in list(self._playlists):
+            await self.async_stop(name)
+        self._heap.clear()
+
+
+def get_sequencer(hass) -> EffectSequencer:
+    if DATA_SEQUENCER not in hass.data:
+        hass.data[DATA_SEQUENCER] = EffectSequencer(hass)
+    return hass.data[DATA_SEQUENCER]
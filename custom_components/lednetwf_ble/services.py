@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import voluptuous as vol
+from bleak_retry_connector import BLEAK_RETRY_EXCEPTIONS as BLEAK_EXCEPTIONS
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, Unauthorized, UnknownUser
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, FILES_DIR, ColorOrdering, LedTypes_RingLight, LedTypes_StripLight
+from .framer import NotificationFramer
+from .lednetwf import LEDNETWFInstance, build_frame
+from .provisioning import async_provision_led_settings
+from .recorder import async_replay_log
+from .scene import async_apply_scene, async_start_effect_synchronised
+from .sequencer import get_sequencer
+from .tracing import CAPTURE_PROFILE, CAPTURE_SPANS, MAX_CAPTURE, get_tracer
+
+LOGGER = logging.getLogger(__name__)
+
+SERVICE_REPLAY_TRAFFIC = "replay_traffic"
+SERVICE_APPLY_SCENE    = "apply_scene"
+SERVICE_SEND_PACKETS   = "send_packets"
+SERVICE_START_EFFECT   = "start_effect"
+SERVICE_START_PLAYLIST = "start_playlist"
+SERVICE_STOP_PLAYLIST  = "stop_playlist"
+SERVICE_CAPTURE_TRACE  = "capture_trace"
+SERVICE_PROVISION_LEDS = "provision_led_settings"
+SERVICE_TIMELINE       = "export_timeline"
+ATTR_PATH              = "path"
+ATTR_SPEED             = "speed"
+ATTR_ENTITIES          = "entities"
+ATTR_FORCE             = "force"
+ATTR_CHECKSUM          = "checksum"
+ATTR_FRAME_TYPE        = "frame_type"
+ATTR_PACING            = "pacing"
+ATTR_WINDOW            = "window"
+ATTR_EFFECT            = "effect"
+ATTR_BRIGHTNESS        = "brightness"
+ATTR_NAME              = "name"
+ATTR_STEPS             = "steps"
+ATTR_REPEAT            = "repeat"
+ATTR_DURATION          = "duration"
+ATTR_MODE              = "mode"
+ATTR_LED_COUNT         = "led_count"
+ATTR_CHIP_TYPE         = "chip_type"
+ATTR_COLOR_ORDER       = "color_order"
+
+REPLAY_TRAFFIC_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_SPEED, default=1.0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+# One light's target in a scene, with the keys plan_state takes.  Anything else is rejected here, rather than failing
+# inside plan_state.
+SCENE_TARGET_SCHEMA = vol.Schema(
+    {
+        vol.Optional("state", default="on"): vol.In(("on", "off")),
+        vol.Optional(ATTR_BRIGHTNESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+        vol.Exclusive("color_temp_kelvin", "look"): vol.All(vol.Coerce(int), vol.Range(min=1000, max=10000)),
+        vol.Exclusive("hs_color", "look"): vol.All(vol.ExactSequence((vol.All(vol.Coerce(float), vol.Range(min=0, max=360)),
+                                                                      vol.All(vol.Coerce(float), vol.Range(min=0, max=100)))), vol.Coerce(tuple)),
+        vol.Exclusive("rgb_color", "look"): vol.All(vol.ExactSequence((cv.byte,) * 3), vol.Coerce(tuple)),
+        vol.Exclusive(ATTR_EFFECT, "look"): cv.string,
+        vol.Optional("effect_speed"): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+    }
+)
+
+APPLY_SCENE_SCHEMA = vol.Schema(
+    {
+        # Also takes the same shorthand as scene.apply, i.e. "light.x": "off"
+        vol.Required(ATTR_ENTITIES): vol.Schema({cv.entity_id: vol.Any(vol.All(vol.In(("on", "off")), lambda state: {"state": state}),
+                                                                       SCENE_TARGET_SCHEMA)}),
+        vol.Optional(ATTR_FORCE, default=False): cv.boolean,
+    }
+)
+
+def _hex_payload(value):
+    try:
+        payload = bytes.fromhex(str(value))
+    except ValueError as error:
+        raise vol.Invalid(f"{value} is not a hex string") from error
+    if not payload:
+        raise vol.Invalid("Empty payload")
+    return payload
+
+SEND_PACKETS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITIES): vol.Schema({cv.entity_id: vol.All(cv.ensure_list, [_hex_payload])}),
+        vol.Optional(ATTR_CHECKSUM, default=True): cv.boolean,
+        vol.Optional(ATTR_FRAME_TYPE, default=0x0b): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+        vol.Optional(ATTR_PACING, default=50): vol.All(vol.Coerce(int), vol.Range(min=0, max=10000)),
+        vol.Optional(ATTR_WINDOW, default=1.0): vol.All(vol.Coerce(float), vol.Range(min=0, max=30)),
+    }
+)
+
+START_EFFECT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITIES): cv.entity_ids,
+        vol.Required(ATTR_EFFECT): cv.string,
+        vol.Optional(ATTR_BRIGHTNESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+    }
+)
+
+PLAYLIST_STEP_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Exclusive(ATTR_EFFECT, "look"): cv.string,
+            vol.Exclusive("rgb_color", "look"): vol.All(vol.ExactSequence((cv.byte,) * 3), vol.Coerce(tuple)),
+            vol.Exclusive("hs_color", "look"): vol.All(vol.ExactSequence((vol.Coerce(float),) * 2), vol.Coerce(tuple)),
+            vol.Exclusive("color_temp_kelvin", "look"): cv.positive_int,
+            vol.Optional(ATTR_BRIGHTNESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+            vol.Optional(ATTR_SPEED): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+            vol.Required(ATTR_DURATION): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        }
+    ),
+    # The sequencer takes plan_state targets, where speed goes by its full name
+    lambda step: {("effect_speed" if key == ATTR_SPEED else key): value for key, value in step.items()},
+)
+
+START_PLAYLIST_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITIES): cv.entity_ids,
+        vol.Required(ATTR_STEPS): vol.All(cv.ensure_list, vol.Length(min=1), [PLAYLIST_STEP_SCHEMA]),
+        vol.Optional(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_REPEAT, default=True): cv.boolean,
+    }
+)
+
+STOP_PLAYLIST_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_ENTITIES): cv.entity_ids,
+    }
+)
+
+CAPTURE_TRACE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=30): vol.All(vol.Coerce(float), vol.Range(min=1, max=MAX_CAPTURE)),
+        vol.Optional(ATTR_MODE, default=CAPTURE_SPANS): vol.In((CAPTURE_SPANS, CAPTURE_PROFILE)),
+        vol.Optional(ATTR_PATH): cv.string,
+    }
+)
+
+PROVISION_LEDS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_ENTITIES): cv.entity_ids,
+            vol.Optional(ATTR_LED_COUNT): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+            # Whether a chip type suits each light's model is checked per light
+            vol.Optional(ATTR_CHIP_TYPE): vol.In(sorted({chip.name for chip in (*LedTypes_StripLight, *LedTypes_RingLight)})),
+            vol.Optional(ATTR_COLOR_ORDER): vol.In([order.name for order in ColorOrdering]),
+            vol.Optional(ATTR_FORCE, default=False): cv.boolean,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_LED_COUNT, ATTR_CHIP_TYPE, ATTR_COLOR_ORDER),
+)
+
+EXPORT_TIMELINE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITIES): cv.entity_ids,
+    }
+)
+
+
+def async_get_instance(hass: HomeAssistant, entity_id: str) -> LEDNETWFInstance:
+    """Find the device instance behind one of our entities."""
+    entry = entity_registry.async_get(hass).async_get(entity_id)
+    if entry is None or entry.platform != DOMAIN or entry.config_entry_id not in hass.data.get(DOMAIN, {}):
+        raise HomeAssistantError(f"{entity_id} is not a LEDnetWF light")
+    return hass.data[DOMAIN][entry.config_entry_id]
+
+
+def _files_path(hass: HomeAssistant, name: str) -> str:
+    """Full path of a file in FILES_DIR.  Only a bare file name is accepted, so a service call can't reach anything else."""
+    if not name or name in (".", "..") or os.path.basename(name) != name or (os.altsep and os.altsep in name):
+        raise HomeAssistantError(f"{name!r} must be a file name in {FILES_DIR} in the config directory, without any directories")
+    return hass.config.path(FILES_DIR, name)
+
+
+def _admin_only(hass: HomeAssistant, handler):
+    """The check async_register_admin_service makes, for services that return a response, which it can't register on
+    the Home Assistant versions we support."""
+    async def _async_admin_handler(call: ServiceCall) -> ServiceResponse:
+        if call.context.user_id:
+            user = await hass.auth.async_get_user(call.context.user_id)
+            if user is None:
+                raise UnknownUser(context=call.context, permission="admin", user_id=call.context.user_id)
+            if not user.is_admin:
+                raise Unauthorized(context=call.context, permission="admin", user_id=call.context.user_id)
+        return await handler(call)
+    return _async_admin_handler
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def _async_replay_traffic(call: ServiceCall) -> ServiceResponse:
+        path = _files_path(hass, call.data[ATTR_PATH])
+        if not await hass.async_add_executor_job(os.path.isfile, path):
+            raise HomeAssistantError(f"No traffic log called {call.data[ATTR_PATH]} in {FILES_DIR}")
+        result = await async_replay_log(hass, path, call.data[ATTR_SPEED])
+        LOGGER.debug("Replay of %s: %s", path, result.as_dict())
+        return result.as_dict()
+
+    async def _async_apply_scene(call: ServiceCall) -> ServiceResponse:
+        targets = {}
+        for entity_id, target in call.data[ATTR_ENTITIES].items():
+            instance = async_get_instance(hass, entity_id)
+            if ATTR_EFFECT in target and target[ATTR_EFFECT] not in instance.effect_list:
+                raise HomeAssistantError(f"{instance.name} doesn't have an effect called {target[ATTR_EFFECT]}")
+            targets[instance] = dict(target)
+        result = await async_apply_scene(targets, call.data[ATTR_FORCE])
+        return result.as_dict()
+
+    async def _async_send_packets(call: ServiceCall) -> ServiceResponse:
+        requests = {}
+        for entity_id, payloads in call.data[ATTR_ENTITIES].items():
+            try:
+                frames = [build_frame(payload, call.data[ATTR_CHECKSUM], call.data[ATTR_FRAME_TYPE]) for payload in payloads]
+            except ValueError as error:
+                raise HomeAssistantError(f"{entity_id}: {error}") from error
+            requests[entity_id] = (async_get_instance(hass, entity_id), frames)
+
+        async def _async_send(instance, frames) -> dict:
+            try:
+                received = await instance.send_raw(frames, call.data[ATTR_PACING] / 1000, call.data[ATTR_WINDOW])
+            except BLEAK_EXCEPTIONS as error:
+                return {"error": str(error)}
+            framer        = NotificationFramer(verify=False) # Return whatever the device said, even if it looks wrong
+            notifications = [payload.hex() for data in received for payload in framer.feed(data)]
+            return {"sent": [frame.hex() for frame in frames], "notifications": notifications}
+
+        # Each device gets its own connection, so they can all go at once
+        results = await asyncio.gather(*[_async_send(instance, frames) for instance, frames in requests.values()])
+        return dict(zip(requests, results))
+
+    async def _async_start_effect(call: ServiceCall) -> ServiceResponse:
+        instances = [async_get_instance(hass, entity_id) for entity_id in call.data[ATTR_ENTITIES]]
+        result = await async_start_effect_synchronised(instances, call.data[ATTR_EFFECT], call.data.get(ATTR_BRIGHTNESS))
+        return result.as_dict()
+
+    async def _async_start_playlist(call: ServiceCall) -> ServiceResponse:
+        entities  = call.data[ATTR_ENTITIES]
+        instances = [async_get_instance(hass, entity_id) for entity_id in entities]
+        name      = call.data.get(ATTR_NAME) or ",".join(sorted(entities))
+        for instance in instances:
+            for step in call.data[ATTR_STEPS]:
+                if ATTR_EFFECT in step and step[ATTR_EFFECT] not in instance.effect_list:
+                    raise HomeAssistantError(f"{instance.name} doesn't have an effect called {step[ATTR_EFFECT]}")
+        playlist = await get_sequencer(hass).async_start(name, instances, call.data[ATTR_STEPS], call.data[ATTR_REPEAT])
+        return playlist.as_dict()
+
+    async def _async_stop_playlist(call: ServiceCall) -> ServiceResponse:
+        sequencer = get_sequencer(hass)
+        names     = [call.data[ATTR_NAME]] if ATTR_NAME in call.data else list(sequencer.playlists)
+        if ATTR_ENTITIES in call.data:
+            instances = {async_get_instance(hass, entity_id) for entity_id in call.data[ATTR_ENTITIES]}
+            names     = [name for name in names if name in sequencer.playlists and instances & set(sequencer.playlists[name].instances)]
+        stopped = [await sequencer.async_stop(name) for name in names]
+        return {"stopped": [playlist.as_dict() for playlist in stopped if playlist is not None]}
+
+    async def _async_capture_trace(call: ServiceCall) -> ServiceResponse:
+        tracer = get_tracer(hass)
+        if tracer.capturing:
+            raise HomeAssistantError("A trace capture is already running")
+        mode = call.data[ATTR_MODE]
+        name = call.data.get(ATTR_PATH) or f"lednetwf_ble_{mode}_{dt_util.now().strftime('%Y%m%d_%H%M%S')}.{'prof' if mode == CAPTURE_PROFILE else 'json'}"
+        path = _files_path(hass, name)
+        await hass.async_add_executor_job(lambda: os.makedirs(os.path.dirname(path), exist_ok=True))
+        result = await tracer.async_capture(hass, call.data[ATTR_DURATION], path, mode)
+        LOGGER.info("Saved %s seconds of %s to %s", result["seconds"], mode, result["path"])
+        return result
+
+    async def _async_provision_led_settings(call: ServiceCall) -> ServiceResponse:
+        targets = {}
+        for entity_id in call.data[ATTR_ENTITIES]:
+            instance = async_get_instance(hass, entity_id)
+            entry_id = entity_registry.async_get(hass).async_get(entity_id).config_entry_id
+            targets[hass.config_entries.async_get_entry(entry_id)] = instance
+        result = await async_provision_led_settings(
+            hass,
+            targets,
+            call.data.get(ATTR_LED_COUNT),
+            call.data.get(ATTR_CHIP_TYPE),
+            call.data.get(ATTR_COLOR_ORDER),
+            call.data[ATTR_FORCE],
+        )
+        return result.as_dict()
+
+    async def _async_export_timeline(call: ServiceCall) -> ServiceResponse:
+        return {entity_id: async_get_instance(hass, entity_id).timeline for entity_id in call.data[ATTR_ENTITIES]}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_TIMELINE,
+        _async_export_timeline,
+        schema=EXPORT_TIMELINE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROVISION_LEDS,
+        _async_provision_led_settings,
+        schema=PROVISION_LEDS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CAPTURE_TRACE,
+        _admin_only(hass, _async_capture_trace), # Reads or writes files
+        schema=CAPTURE_TRACE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_PLAYLIST,
+        _async_start_playlist,
+        schema=START_PLAYLIST_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_PLAYLIST,
+        _async_stop_playlist,
+        schema=STOP_PLAYLIST_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_EFFECT,
+        _async_start_effect,
+        schema=START_EFFECT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEND_PACKETS,
+        _async_send_packets,
+        schema=SEND_PACKETS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_SCENE,
+        _async_apply_scene,
+        schema=APPLY_SCENE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY_TRAFFIC,
+        _admin_only(hass, _async_replay_traffic), # Reads or writes files
+        schema=REPLAY_TRAFFIC_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
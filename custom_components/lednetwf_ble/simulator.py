@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import time
+
+from bleak.exc import BleakError
+
+from .const import (
+    RING_LIGHT_MODEL,
+    STRIP_LIGHT_MODEL,
+)
+from .colors import hsv_to_rgb_array
+from .lednetwf import LEDNETWFInstance
+
+LOGGER = logging.getLogger(__name__)
+
+SIMULATED_WRITE_UUID  = "0000ff01-0000-1000-8000-00805f9b34fb"
+SIMULATED_NOTIFY_UUID = "0000ff02-0000-1000-8000-00805f9b34fb"
+SIMULATED_MTU         = 247 # What BlueZ and the ESPHome proxies usually negotiate with these controllers
+
+# A software stand-in for a LEDnetWF controller.  It understands the same frames that LEDNETWFInstance sends and answers
+# with notifications in the same format as the real hardware, so that recorded sessions can be replayed and the
+# integration can be exercised without a radio.
+
+class SimulatedDevice:
+    def __init__(self, model=STRIP_LIGHT_MODEL, led_count=64, accepts_packed: bool = True) -> None:
+        self.model        = model
+        self.accepts_packed = accepts_packed
+        self.led_count    = led_count
+        self.chip_type    = 0x01
+        self.color_order  = 0x02
+        self.is_on        = True
+        self.mode         = 0x61
+        self.effect       = 0xf0
+        self.speed        = 0x64
+        self.rgb          = (255, 0, 0)
+        self.white_temp   = 0
+        self.brightness   = 100
+        self.pixels       = bytearray(led_count * 3)
+        self.frames       = 0
+        self.last_frame_at = 0.0 # Monotonic time the last frame arrived, for checking how closely devices are synchronised
+
+    def manufacturer_data(self) -> dict[int, bytes]:
+        """Advertisement manufacturer data in the layout LEDNETWFInstance._detect_model expects."""
+        data = bytearray(27)
+        data[0]  = self.model
+        data[8:11] = bytes([0x00, 0x01, 0x00]) # Firmware minor version
+        data[14] = 0x23 if self.is_on else 0x24
+        data[15] = self.mode
+        data[16] = self.effect
+        if self.mode == 0x25:
+            data[17], data[18], data[19] = self.speed, self.brightness, self.speed
+        else:
+            data[17] = self.brightness if self.effect == 0x0f else self.speed
+            data[18:21] = bytes(self.rgb)
+            data[21] = self.white_temp
+        data[24] = self.led_count & 0xFF
+        return {0x5A00 | self.model: bytes(data)}
+
+    def handle_write(self, data) -> list[bytes]:
+        """Handle one GATT write, which may hold several frames back to back if the firmware accepts packing."""
+        notifications = []
+        offset = 0
+        while offset + 8 <= len(data):
+            length = 8 + data[offset + 5]
+            notifications += self.handle_frame(data[offset:offset + length])
+            offset += length
+            if not self.accepts_packed:
+                break
+        return notifications
+
+    def handle_frame(self, frame) -> list[bytes]:
+        """Apply one outgoing frame to the simulated state and return the notifications the device would send."""
+        self.frames += 1
+        self.last_frame_at = time.monotonic()
+        if len(frame) < 9 or frame[2] != 0x80:
+            LOGGER.debug("Simulator ignoring malformed frame: %s", bytes(frame).hex())
+            return []
+        inner = frame[8:8 + frame[5]]
+        command = inner[0]
+        if command == 0x81:
+            return [self.status_notification()]
+        if command == 0x63:
+            return [self.settings_notification()]
+        if command == 0x3b:
+            if inner[1] == 0x23:
+                self.is_on = True
+            elif inner[1] == 0x24:
+                self.is_on = False
+            elif inner[1] == 0xa1:
+                self.mode, self.effect = 0x61, 0xf0
+                self.rgb        = _hsv_to_rgb(inner[2] * 2, inner[3], inner[4])
+                self.brightness = inner[4]
+            elif inner[1] == 0xb1:
+                self.mode, self.effect = 0x61, 0x0f
+                self.white_temp = inner[5]
+                self.brightness = inner[6]
+        elif command == 0x41:
+            self.mode   = 0x61
+            self.effect = 0x01 if inner[1] == 0 else inner[1]
+            self.rgb    = tuple(inner[2:5])
+            self.speed  = inner[8]
+        elif command in (0x38, 0x42):
+            self.mode, self.effect, self.speed, self.brightness = 0x25, inner[1], inner[2], inner[3]
+        elif command == 0x59:
+            start = int.from_bytes(inner[1:3], byteorder='big')
+            count = int.from_bytes(inner[3:5], byteorder='big')
+            if len(self.pixels) < (start + count) * 3:
+                self.pixels.extend(bytes((start + count) * 3 - len(self.pixels)))
+            self.pixels[start * 3:(start + count) * 3] = inner[5:5 + count * 3]
+            return [] # Streaming pixels doesn't generate a status notification
+        elif command == 0x73:
+            self.mode, self.effect = 0x62, inner[3]
+            self.rgb        = tuple(inner[4:7])
+            self.brightness = inner[11]
+        elif command == 0x62:
+            if self.model == STRIP_LIGHT_MODEL:
+                self.led_count   = int.from_bytes(inner[1:3], byteorder='big')
+                self.chip_type   = inner[5]
+                self.color_order = inner[6]
+            else:
+                self.led_count   = inner[2]
+                self.chip_type   = inner[3]
+                self.color_order = inner[4]
+            return []
+        else:
+            return []
+        return [self.status_notification()]
+
+    def status_notification(self) -> bytes:
+        payload = bytearray(14)
+        payload[0] = 0x81
+        payload[1] = self.model
+        payload[2] = 0x23 if self.is_on else 0x24
+        payload[3] = self.mode
+        payload[4] = self.effect
+        if self.mode == 0x25:
+            if self.model == RING_LIGHT_MODEL:
+                payload[6], payload[7] = self.brightness, self.speed
+            else:
+                payload[5], payload[6] = self.speed, self.brightness
+        elif self.effect == 0x0f:
+            payload[5] = self.brightness
+            payload[9] = self.white_temp
+        else:
+            payload[5] = self.speed
+            payload[6:9] = bytes(self.rgb)
+        payload[12] = self.led_count & 0xFF
+        payload[13] = sum(payload[:13]) & 0xFF
+        return _wrap(payload)
+
+    def settings_notification(self) -> bytes:
+        if self.model == RING_LIGHT_MODEL:
+            payload = bytearray([0x63, 0x00, self.led_count & 0xFF, self.chip_type, self.color_order, 0x00])
+        else:
+            payload = bytearray([0x00, 0x63]) + self.led_count.to_bytes(2, byteorder='big') + bytearray([0x00, 0x01, self.chip_type, self.color_order, 0x00])
+        payload[-1] = sum(payload[:-1]) & 0xFF
+        return _wrap(payload)
+
+
+class SimulatedClient:
+    """Enough of the BleakClientWithServiceCache interface for LEDNETWFInstance to drive a SimulatedDevice."""
+
+    def __init__(self, device: SimulatedDevice, latency: float = 0.0, mtu_size: int = SIMULATED_MTU) -> None:
+        self.device        = device
+        self.latency       = latency
+        self.mtu_size      = mtu_size
+        self.is_connected  = True
+        self.services      = _SimulatedServices()
+        self.writes        = 0
+        self.bytes_written = 0
+        self._callback     = None
+
+    async def get_services(self):
+        return self.services
+
+    async def start_notify(self, _char, callback) -> None:
+        self._callback = callback
+
+    async def stop_notify(self, _char) -> None:
+        self._callback = None
+
+    async def disconnect(self) -> None:
+        self.is_connected = False
+
+    async def write_gatt_char(self, _char, data, response=False) -> None:
+        if not self.is_connected:
+            raise BleakError("Simulated device is not connected")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.writes        += 1
+        self.bytes_written += len(data)
+        loop = asyncio.get_running_loop()
+        for notification in self.device.handle_write(bytearray(data)):
+            if self._callback is not None:
+                loop.call_soon(self._callback, None, bytearray(notification))
+
+
+async def async_create_instance(hass, device: SimulatedDevice, mac: str = "00:00:00:00:00:01", latency: float = 0.0,
+                                mtu_size: int = SIMULATED_MTU, options: dict | None = None) -> tuple[LEDNETWFInstance, SimulatedClient]:
+    """Build an instance which is already connected to a simulated device."""
+    instance = LEDNETWFInstance(mac, hass, {}, options or {}, ble_device=SimulatedBLEDevice(mac), manufacturer_data=device.manufacturer_data())
+    client   = SimulatedClient(device, latency=latency, mtu_size=mtu_size)
+    await instance._setup_client(client)
+    return instance, client
+
+
+class SimulatedBLEDevice:
+    """Stand-in for bleak's BLEDevice carrying the attributes the integration reads."""
+
+    def __init__(self, address: str, name: str = "LEDnetWF Simulator", rssi: int = -60) -> None:
+        self.address = address
+        self.name    = name
+        self.rssi    = rssi
+        self.details = None
+
+
+class _SimulatedServices:
+    def get_characteristic(self, uuid):
+        return uuid if uuid in (SIMULATED_WRITE_UUID, SIMULATED_NOTIFY_UUID) else None
+
+
+def _wrap(payload: bytearray) -> bytes:
+    # The controllers wrap their response in a small JSON document with the payload as a hex string
+    return b'{"code":0,"payload":"' + payload.hex().upper().encode() + b'"}'
+
+
+def _hsv_to_rgb(h, s, v):
+    return tuple(int(component) for component in hsv_to_rgb_array([h, s, v]))
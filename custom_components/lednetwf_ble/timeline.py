@@ -0,0 +1,106 @@
+import struct
+import time
+from datetime import datetime, timezone
+
+from homeassistant.components.light import ColorMode
+
+TIMELINE_LENGTH      = 128 # Transitions kept per device, 2kB
+SOURCE_COMMAND       = 0
+SOURCE_NOTIFICATION  = 1
+SOURCE_ADVERTISEMENT = 2
+SOURCES              = ("command", "notification", "advertisement")
+COLOR_MODES          = (None, ColorMode.RGB, ColorMode.HS, ColorMode.COLOR_TEMP, ColorMode.BRIGHTNESS)
+UNKNOWN              = 0xFF   # Power or brightness not known, e.g. only the power is advertised
+NO_EFFECT            = 0xFFFF
+NO_LATENCY           = 0xFFFF # ms, also the cap on what can be stored
+# One transition: time (10ms ticks since TICK_EPOCH), colour, effect (index in the effect list), latency (ms),
+# brightness, power, colour mode and source.  Colour is packed per colour mode, RGB as 0xRRGGBB, HS as hue << 8 |
+# saturation and white as kelvin.
+ENTRY      = struct.Struct("<IIHHBBBB")
+TICK       = 0.01
+TICK_EPOCH = time.time() # Ticks fit in 32 bits for 497 days from here
+
+_MODE_INDEX = {mode: index for index, mode in enumerate(COLOR_MODES)}
+
+
+class StateTimeline:
+    """The last TIMELINE_LENGTH state transitions of one device, in a ring of fixed size records in one bytearray.
+
+    Only changes are kept.  A status notification which confirms what a command already set isn't recorded again, so the
+    ring covers hours of normal use.  The buffer is allocated when the first transition is recorded and never grows.
+    """
+
+    __slots__ = ("_buffer", "_next", "_count", "_last", "_commanded_at")
+
+    def __init__(self) -> None:
+        self._buffer: bytearray | None = None
+        self._next   = 0
+        self._count  = 0
+        self._last   = None # State part of the newest record, to tell whether anything changed
+        self._commanded_at: float | None = None # Monotonic time the last command started
+
+    def __len__(self) -> int:
+        return self._count
+
+    def record(self, source: int, is_on: bool | None, color_mode=None, rgb=None, hs=None, kelvin=None,
+               brightness: int | None = None, effect: int | None = None, latency: float | None = None) -> bool:
+        """Add a transition.  Returns False, recording nothing, if the state is the same as the newest record.
+
+        latency is how long a command took to send.  For notifications it defaults to the time since the last command,
+        i.e. how long the device took to report a state other than the one we asked for.
+        """
+        now = time.monotonic()
+        if source == SOURCE_COMMAND:
+            self._commanded_at = now - (latency or 0.0)
+        elif latency is None and source == SOURCE_NOTIFICATION and self._commanded_at is not None:
+            latency = now - self._commanded_at
+        mode = _MODE_INDEX.get(color_mode, 0)
+        if color_mode is ColorMode.RGB and rgb:
+            colour = int(rgb[0]) << 16 | int(rgb[1]) << 8 | int(rgb[2])
+        elif color_mode is ColorMode.HS and hs:
+            colour = int(hs[0]) << 8 | int(hs[1])
+        elif color_mode is ColorMode.COLOR_TEMP and kelvin:
+            colour = int(kelvin)
+        else:
+            colour = 0
+        state = (colour, NO_EFFECT if effect is None else effect, UNKNOWN if brightness is None else int(brightness),
+                 UNKNOWN if is_on is None else int(is_on), mode)
+        if state == self._last:
+            return False
+        self._last = state
+        if self._buffer is None:
+            self._buffer = bytearray(ENTRY.size * TIMELINE_LENGTH)
+        latency = NO_LATENCY if latency is None else min(int(latency * 1000), NO_LATENCY)
+        ticks   = int((time.time() - TICK_EPOCH) / TICK) & 0xFFFFFFFF
+        ENTRY.pack_into(self._buffer, self._next * ENTRY.size, ticks, state[0], state[1], latency, *state[2:], source)
+        self._next  = (self._next + 1) % TIMELINE_LENGTH
+        self._count = min(self._count + 1, TIMELINE_LENGTH)
+        return True
+
+    def entries(self) -> list[tuple]:
+        """Raw records, oldest first."""
+        first = (self._next - self._count) % TIMELINE_LENGTH
+        return [ENTRY.unpack_from(self._buffer, (first + n) % TIMELINE_LENGTH * ENTRY.size) for n in range(self._count)]
+
+    def as_list(self, effect_list: list[str]) -> list[dict]:
+        """Decoded records, oldest first, for diagnostics and the export_timeline service."""
+        decoded = []
+        for ticks, colour, effect, latency, brightness, power, mode, source in self.entries():
+            color_mode = COLOR_MODES[mode] if mode < len(COLOR_MODES) else None
+            entry = {
+                "time":       datetime.fromtimestamp(TICK_EPOCH + ticks * TICK, timezone.utc).isoformat(),
+                "source":     SOURCES[source],
+                "is_on":      None if power == UNKNOWN else bool(power),
+                "color_mode": color_mode,
+                "brightness": None if brightness == UNKNOWN else brightness,
+                "effect":     effect_list[effect] if effect < len(effect_list) else None,
+                "latency_ms": None if latency == NO_LATENCY else latency,
+            }
+            if color_mode is ColorMode.RGB:
+                entry["rgb_color"] = (colour >> 16 & 0xFF, colour >> 8 & 0xFF, colour & 0xFF)
+            elif color_mode is ColorMode.HS:
+                entry["hs_color"] = (colour >> 8, colour & 0xFF)
+            elif color_mode is ColorMode.COLOR_TEMP:
+                entry["color_temp_kelvin"] = colour
+            decoded.append(entry)
+        return decoded
@@ -0,0 +1,160 @@
+import asyncio
+import cProfile
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+DATA_TRACER      = "lednetwf_ble_tracer"
+MAX_SPANS        = 100000 # Kept in memory during a capture.  A busy setup makes a few hundred a second.
+MAX_CAPTURE      = 600    # Seconds
+MAX_SERVICE_CALL = 5.0    # Seconds.  A context older than this was made for something else, e.g. an automation run.
+CAPTURE_SPANS    = "spans"
+CAPTURE_PROFILE  = "cprofile"
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# Handed out while tracing is off.  nullcontext keeps no state, so one instance can be entered any number of times at once.
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_mac", "_start")
+
+    def __init__(self, tracer, name: str, mac: str | None) -> None:
+        self._tracer = tracer
+        self._name   = name
+        self._mac    = mac
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, error_type, _error, _traceback) -> None:
+        self._tracer.record(self._name, self._mac, self._start, time.monotonic(), error_type)
+
+
+class SpanTracer:
+    """Times the phases of a command, from the HA service call down to the GATT write and the notification it causes.
+
+    Off unless a capture is running, when span() hands back a shared do-nothing context manager, so leaving the spans
+    in the hot paths costs an attribute check and a call.  Spans are saved in the Chrome trace event format, which
+    chrome://tracing and ui.perfetto.dev open directly.  Each asyncio task gets its own track, so the spans of one
+    command nest under each other; notifications, which arrive as loop callbacks rather than in a task, share one.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._spans: deque = deque(maxlen=MAX_SPANS)
+        self._capturing = False
+
+    @property
+    def capturing(self) -> bool:
+        return self._capturing
+
+    def span(self, name: str, mac: str | None = None):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, mac)
+
+    def record(self, name: str, mac: str | None, start: float, end: float, error_type=None) -> None:
+        """Add a span that was timed some other way, e.g. one that started before we were called."""
+        if not self.enabled:
+            return
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None # Not on the event loop
+        self._spans.append((name, mac, start, end, id(task) if task is not None else 0, error_type.__name__ if error_type else None))
+
+    def record_service_call(self, context, mac: str | None = None) -> None:
+        """Add a span for the time HA took to get a service call to us, from when the call's context was created."""
+        if not self.enabled or context is None:
+            return
+        created = _context_created_at(context.id)
+        now     = time.monotonic()
+        # Automations and scripts create one context for a whole run, so an old one says nothing about the service call
+        if created is not None and 0 <= now - created <= MAX_SERVICE_CALL:
+            self.record("service_call", mac, created, now)
+
+    async def async_capture(self, hass, seconds: float, path: str, mode: str = CAPTURE_SPANS) -> dict:
+        """Record spans, or profile the event loop with cProfile, for seconds and save them to path."""
+        self._capturing = True
+        try:
+            if mode == CAPTURE_PROFILE:
+                return await self._async_profile(hass, seconds, path)
+            return await self._async_record(hass, seconds, path)
+        finally:
+            self._capturing = False
+
+    async def _async_profile(self, hass, seconds: float, path: str) -> dict:
+        # cProfile only sees the thread it's enabled in, which is the event loop and everything we run on it
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        await hass.async_add_executor_job(profiler.dump_stats, path)
+        return {"path": path, "mode": CAPTURE_PROFILE, "seconds": seconds}
+
+    async def _async_record(self, hass, seconds: float, path: str) -> dict:
+        self._spans.clear()
+        self.enabled = True
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.enabled = False
+        spans = list(self._spans)
+        self._spans.clear()
+        await hass.async_add_executor_job(_write_trace, path, spans)
+        return {"path": path, "mode": CAPTURE_SPANS, "seconds": seconds, "spans": len(spans), "truncated": len(spans) == MAX_SPANS,
+                "summary": summarise(spans)}
+
+def summarise(spans) -> dict:
+    """Count, total and worst time per span name, in ms, slowest total first."""
+    totals = {}
+    for name, _mac, start, end, _task, error in spans:
+        count, total, worst, errors = totals.get(name, (0, 0.0, 0.0, 0))
+        totals[name] = (count + 1, total + end - start, max(worst, end - start), errors + (error is not None))
+    return {
+        name: {"count": count, "total_ms": round(total * 1000, 3), "max_ms": round(worst * 1000, 3), "errors": errors}
+        for name, (count, total, worst, errors) in sorted(totals.items(), key=lambda item: -item[1][1])
+    }
+
+
+def _write_trace(path: str, spans) -> None:
+    tracks = {0: 0} # Task ids are only unique while the task lives, so map them to small track numbers as they come
+    events = []
+    for name, mac, start, end, task, error in spans:
+        args = {"mac": mac} if mac else {}
+        if error:
+            args["error"] = error
+        events.append({
+            "name": name,
+            "cat":  "lednetwf_ble",
+            "ph":   "X",
+            "ts":   round(start * 1e6, 1),
+            "dur":  round((end - start) * 1e6, 1),
+            "pid":  1,
+            "tid":  tracks.setdefault(task, len(tracks)),
+            "args": args,
+        })
+    with open(path, "w", encoding="utf-8") as trace_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+def _context_created_at(context_id: str) -> float | None:
+    """Monotonic time a HA context was created, read back from the timestamp in its ULID.  Millisecond resolution."""
+    try:
+        millis = 0
+        for char in context_id[:10]:
+            millis = millis * 32 + CROCKFORD_BASE32.index(char)
+    except (TypeError, ValueError):
+        return None
+    return time.monotonic() - (time.time() - millis / 1000)
+
+
+def get_tracer(hass) -> SpanTracer:
+    if DATA_TRACER not in hass.data:
+        hass.data[DATA_TRACER] = SpanTracer()
+    return hass.data[DATA_TRACER]